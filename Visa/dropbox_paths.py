@@ -0,0 +1 @@
+../feral-keywords/utilities/dropbox_paths.py
\ No newline at end of file
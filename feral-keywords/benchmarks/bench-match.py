@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark search.py's per-path term check against the number of terms.
+
+Usage:
+    bench-match.py [--scope DIR | --entries N] [--max-terms N] [--repeat N] [--output FILE]
+
+Collects the lowercased relative paths of a tree (a make_tree.py tree unless
+--scope is given) and times, for 1 to --max-terms terms plus one excluded
+term, three ways of deciding whether a path matches:
+
+  loop      all(t in hay for t in terms) and not any(n in hay for n in negated),
+            what the engines ran per path before search_match
+  compiled  search_match.compile(terms, negated), built once per query
+  automaton an Aho-Corasick automaton over every term, built once per query
+            and stepped through in Python: one pass per path whatever the
+            number of terms (the alternative search_match passed over)
+
+in two cases:
+
+  typical   terms are vocabulary words, so most paths fail a test early
+  all-hit   every path holds every term (the same long path, repeated), so
+            every test runs — the worst case for anything that scans per term
+
+Each figure is nanoseconds per path, the best of --repeat passes. All three
+are checked to agree on every path first. The JSON goes to --output (or
+stdout).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'utilities'))
+
+import make_tree  # noqa: E402
+import search  # noqa: E402
+import search_match  # noqa: E402
+
+EXCLUDED = 'zzqx'
+
+
+def collect_paths(scope):
+    return [rel.lower() for rel, _full, _is_dir, _st in search.walk_tree(scope, ignore=False)]
+
+
+def loop_check(terms, negated):
+    return lambda hay: all(t in hay for t in terms) and not any(n in hay for n in negated)
+
+
+def automaton_check(terms, negated):
+    """An Aho-Corasick matcher for terms and negated: one pass over the path,
+    collecting a bit per term found."""
+    goto = [{}]
+    out = [0]
+    patterns = list(terms) + list(negated)
+    for bit, pattern in enumerate(patterns):
+        node = 0
+        for ch in pattern:
+            nxt = goto[node].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[node][ch] = nxt
+                goto.append({})
+                out.append(0)
+            node = nxt
+        out[node] |= 1 << bit
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for node in queue:
+        for ch, child in goto[node].items():
+            queue.append(child)
+            f = fail[node]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[child] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != child else 0
+            out[child] |= out[fail[child]]
+    want = (1 << len(terms)) - 1
+    banned = ((1 << len(negated)) - 1) << len(terms)
+
+    def check(hay):
+        node = 0
+        found = 0
+        for ch in hay:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            found |= out[node]
+            if found & banned:
+                return False
+        return found & want == want
+    return check
+
+
+def time_check(check, paths, repeat):
+    """Best nanoseconds per path over repeat passes."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for hay in paths:
+            check(hay)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / len(paths) * 1e9)
+
+
+def chunks(path, n, size=3):
+    """n distinct, non-overlapping size-character pieces of path."""
+    out = []
+    for i in range(0, len(path) - size + 1, size):
+        piece = path[i:i + size]
+        if piece not in out and not any(piece in o or o in piece for o in out):
+            out.append(piece)
+        if len(out) == n:
+            break
+    return out
+
+
+def bench_case(paths, term_sets, repeat):
+    rows = []
+    for terms in term_sets:
+        negated = [EXCLUDED]
+        loop = loop_check(terms, negated)
+        compiled = search_match.compile(terms, negated)
+        automaton = automaton_check(terms, negated)
+        if any(loop(hay) != compiled(hay) for hay in paths):
+            raise SystemExit(f"compiled check disagrees with the loop for {terms}")
+        if any(loop(hay) != automaton(hay) for hay in paths):
+            raise SystemExit(f"automaton disagrees with the loop for {terms}")
+        rows.append({
+            'terms': len(terms),
+            'matches': sum(map(compiled, paths)),
+            'loop_ns': time_check(loop, paths, repeat),
+            'compiled_ns': time_check(compiled, paths, repeat),
+            'automaton_ns': time_check(automaton, paths, repeat),
+        })
+    return rows
+
+
+def print_table(report, file=sys.stderr):
+    for case, rows in report['cases'].items():
+        print(f"{case}: ns per path ({report['paths']} paths)", file=file)
+        print(f"  {'terms':>5} {'loop':>8} {'compiled':>9} {'automaton':>10} {'matches':>8}", file=file)
+        for row in rows:
+            print(f"  {row['terms']:>5} {row['loop_ns']:>8} {row['compiled_ns']:>9} "
+                  f"{row['automaton_ns']:>10} {row['matches']:>8}", file=file)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--scope', help='existing folder to take paths from (default: a generated tree)')
+    ap.add_argument('--entries', type=int, default=make_tree.DEFAULT_ENTRIES)
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--max-terms', type=int, default=8)
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = ap.parse_args()
+
+    if args.scope:
+        paths = collect_paths(os.path.expanduser(args.scope))
+    else:
+        tmp = tempfile.mkdtemp(prefix='bench-match-')
+        try:
+            print(f"Building a {args.entries}-entry tree…", file=sys.stderr)
+            make_tree.build(os.path.join(tmp, 'tree'), args.entries, seed=args.seed)
+            paths = collect_paths(os.path.join(tmp, 'tree'))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if not paths:
+        ap.error('no paths to match against')
+
+    rng = random.Random(args.seed)
+    counts = range(1, args.max_terms + 1)
+    words = [rng.sample(make_tree.WORDS, n) for n in counts]
+    longest = max(paths, key=len)
+    pieces = chunks(longest, args.max_terms)
+    report = {
+        'version': 2,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'paths': len(paths),
+        'cases': {
+            'typical': bench_case(paths, words, args.repeat),
+            'all-hit': bench_case([longest] * len(paths), [pieces[:n] for n in counts if n <= len(pieces)],
+                                  args.repeat),
+        },
+    }
+    print_table(report)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Benchmark search.py's engines end to end and record the numbers as JSON.
+
+Usage:
+    bench-search.py [--scope DIR | --entries N [make_tree options]]
+                    [--engines NAME ...] [--match substring|fuzzy] [--types files|dirs|all]
+                    [--repeat N] [--syscalls] [--output FILE] [--baseline FILE] [query ...]
+
+Every query is run --repeat times per engine, each time as its own `search.py`
+process — the way Alfred runs it, interpreter startup included — with the
+daemon out of the way, no time budget, and the prefix cache cleared, so each
+run searches for real. An engine's persistent state (the index, the locate
+database) is built by one untimed warm-up run first, as it would be after the
+first keystroke.
+
+Reported per engine, over all its runs, and per query:
+  p50_ms, p95_ms  wall-clock latency
+  peak_rss_kb     largest resident set of any run (from wait4's rusage)
+  syscalls        system calls per run, median — only with --syscalls, which
+                  runs every query once more under `strace -f -c` (Linux)
+
+Without --scope a tree is generated with make_tree.py (same arguments, same
+tree), so runs on different machines or versions are comparable. The JSON
+goes to --output (or stdout); --baseline prints the change against an earlier
+file. spotlight and hybrid are answered by fake-mdfind off macOS.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'utilities'))
+
+import make_tree  # noqa: E402
+import search_locate  # noqa: E402
+
+SEARCH = os.path.join(HERE, '..', 'utilities', 'search.py')
+FAKE_MDFIND = os.path.join(HERE, 'fake-mdfind', 'mdfind')
+DEFAULT_ENGINES = ['walk', 'index', 'locate']
+DEFAULT_QUERIES = ['a', 'fe', 'feral', 'report final', 'img 2', 'logo png', 'zzqx']
+# Per-query state that would let a run skip the search.
+QUERY_STATE = ('.prefix', '.resume')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def max_rss_kb(usage):
+    # ru_maxrss is kilobytes on Linux but bytes on macOS.
+    return usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+
+
+def clear_query_state(cache):
+    for name in os.listdir(cache):
+        if name.endswith(QUERY_STATE):
+            os.remove(os.path.join(cache, name))
+
+
+def search_cmd(scope, engine, args, query):
+    return [sys.executable, SEARCH, '--engine', engine, '--types', args.types,
+            '--match', args.match, '--budget', '0', scope, '--', query]
+
+
+def run_once(cmd, env):
+    """(seconds, peak RSS in KB) of one run; raises if it fails."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+    _pid, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return elapsed, max_rss_kb(usage)
+
+
+def count_syscalls(cmd, env):
+    """Total system calls of one run, from strace's summary; None if unavailable."""
+    fd, out = tempfile.mkstemp(prefix='bench-strace-')
+    os.close(fd)
+    try:
+        subprocess.run(['strace', '-f', '-c', '-o', out] + cmd, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(out) as f:
+            for line in f:
+                fields = line.split()
+                if fields and fields[-1] == 'total':
+                    return int(fields[3])
+    except (OSError, subprocess.CalledProcessError, ValueError, IndexError):
+        return None
+    finally:
+        os.remove(out)
+    return None
+
+
+def summarize(times, rss, syscalls):
+    out = {
+        'runs': len(times),
+        'p50_ms': round(percentile(times, 50) * 1000, 2),
+        'p95_ms': round(percentile(times, 95) * 1000, 2),
+        'peak_rss_kb': max(rss),
+    }
+    if syscalls:
+        out['syscalls'] = percentile(syscalls, 50)
+    return out
+
+
+def bench_engine(engine, scope, queries, args, env):
+    cache = env['alfred_workflow_cache']
+    subprocess.run(search_cmd(scope, engine, args, queries[0]), env=env,
+                   stdout=subprocess.DEVNULL, check=True)
+    times, rss, calls = [], [], []
+    per_query = {}
+    for query in queries:
+        cmd = search_cmd(scope, engine, args, query)
+        q_times, q_rss, q_calls = [], [], []
+        for _ in range(args.repeat):
+            clear_query_state(cache)
+            elapsed, peak = run_once(cmd, env)
+            q_times.append(elapsed)
+            q_rss.append(peak)
+        if args.syscalls:
+            clear_query_state(cache)
+            n = count_syscalls(cmd, env)
+            if n is not None:
+                q_calls.append(n)
+        per_query[query] = summarize(q_times, q_rss, q_calls)
+        times += q_times
+        rss += q_rss
+        calls += q_calls
+    result = summarize(times, rss, calls)
+    result['queries'] = per_query
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', '-C', HERE, 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(report, baseline=None, file=sys.stderr):
+    print(f"{'engine':<10} {'p50 ms':>9} {'p95 ms':>9} {'peak RSS':>10} {'syscalls':>9}", file=file)
+    for engine, res in report['engines'].items():
+        line = (f"{engine:<10} {res['p50_ms']:>9.1f} {res['p95_ms']:>9.1f} "
+                f"{res['peak_rss_kb'] / 1024:>7.1f} MB {res.get('syscalls', '-'):>9}")
+        old = (baseline or {}).get('engines', {}).get(engine)
+        if old:
+            deltas = []
+            for key in ('p50_ms', 'p95_ms', 'peak_rss_kb', 'syscalls'):
+                if old.get(key) and key in res:
+                    deltas.append(f"{key.split('_')[0]} {(res[key] - old[key]) / old[key]:+.0%}")
+            line += '   vs baseline: ' + ', '.join(deltas)
+        print(line, file=file)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--scope', help='existing folder to search (default: a generated tree)')
+    ap.add_argument('--entries', type=int, default=make_tree.DEFAULT_ENTRIES)
+    ap.add_argument('--depth', type=int, default=5)
+    ap.add_argument('--fanout', type=int, default=6)
+    ap.add_argument('--names', choices=['words', 'random', 'zipf'], default='words')
+    ap.add_argument('--noise', type=float, default=0.1)
+    ap.add_argument('--unicode', type=float, default=0.02)
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--engines', nargs='+', default=DEFAULT_ENGINES)
+    ap.add_argument('--match', choices=['substring', 'fuzzy'], default='substring')
+    ap.add_argument('--types', choices=['files', 'dirs', 'all'], default='all')
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--syscalls', action='store_true', help='also count system calls with strace')
+    ap.add_argument('--output', help='write the JSON report here instead of stdout')
+    ap.add_argument('--baseline', help='earlier JSON report to compare against')
+    ap.add_argument('queries', nargs='*')
+    args = ap.parse_args()
+    if args.syscalls and not shutil.which('strace'):
+        ap.error('--syscalls needs strace on PATH')
+    queries = args.queries or DEFAULT_QUERIES
+
+    tmp = tempfile.mkdtemp(prefix='bench-search-')
+    try:
+        if args.scope:
+            scope = os.path.abspath(os.path.expanduser(args.scope))
+            tree = {'scope': scope}
+        else:
+            scope = os.path.join(tmp, 'tree')
+            print(f"Building a {args.entries}-entry tree…", file=sys.stderr)
+            tree = make_tree.build(scope, args.entries, args.depth, args.fanout, args.names,
+                                   args.noise, args.unicode, args.seed)
+            tree['params'] = {key: getattr(args, key) for key in
+                              ('entries', 'depth', 'fanout', 'names', 'noise', 'unicode', 'seed')}
+
+        env = dict(os.environ)
+        env['FERAL_SEARCH_SOCKET'] = os.path.join(tmp, 'no-daemon.sock')
+        if sys.platform != 'darwin' and ({'spotlight', 'hybrid'} & set(args.engines)):
+            db = os.path.join(tmp, 'paths.locate')
+            search_locate.build_db(scope, db)
+            env.update({'FERAL_MDFIND': FAKE_MDFIND, 'FAKE_MDFIND_DB': db})
+
+        report = {
+            'version': 1,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'tree': tree,
+            'settings': {'match': args.match, 'types': args.types, 'repeat': args.repeat,
+                         'queries': queries},
+            'engines': {},
+        }
+        for engine in args.engines:
+            cache = os.path.join(tmp, 'cache-' + re.sub(r'\W', '_', engine))
+            os.makedirs(cache)
+            env['alfred_workflow_cache'] = cache
+            print(f"  {engine}…", file=sys.stderr)
+            report['engines'][engine] = bench_engine(engine, scope, queries, args, env)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(report, baseline)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
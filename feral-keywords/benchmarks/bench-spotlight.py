@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tune search.py's spotlight caps against the stand-in mdfind, off macOS.
+
+Usage:
+    bench-spotlight.py [--scope DIR] [--latency MS] [--line-latency MS]
+                       [--read-caps N ...] [--keep-caps N ...] [query ...]
+
+Runs the spotlight engine through fake-mdfind/mdfind (answering from a locate
+database of --scope, built once up front) for every READ_CAP × KEEP_CAP pair
+and reports, per pair, the mean time per query, how often a cap cut the stream
+short, and recall: the share of the exhaustive walk engine's top results that
+the spotlight engine's top results also contain. Without --scope a synthetic
+tree with node_modules noise is built in a temp dir.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'utilities'))
+
+import search  # noqa: E402
+import search_locate  # noqa: E402
+
+FAKE_MDFIND = os.path.join(HERE, 'fake-mdfind', 'mdfind')
+DEFAULT_QUERIES = ['a', 'fe', 'feral', 'header', 'feral txt', 'img 2']
+WORDS = ['feral', 'header', 'alpha', 'beta', 'docs', 'assets', 'img', 'notes', 'readme', 'index']
+
+
+def build_tree(root, depth=4, fanout=4, files=12):
+    """Deterministic tree of word-named files, with a node_modules per branch."""
+    stack = [(root, 0, 0)]
+    while stack:
+        path, level, seed = stack.pop()
+        os.makedirs(path, exist_ok=True)
+        for i in range(files):
+            word = WORDS[(seed + i * 7) % len(WORDS)]
+            open(os.path.join(path, f'{word}-{i}.txt'), 'w').close()
+        if level == 1:
+            junk = os.path.join(path, 'node_modules', 'feral-pkg')
+            os.makedirs(junk, exist_ok=True)
+            for i in range(files * 4):
+                open(os.path.join(junk, f'feral-{i}.js'), 'w').close()
+        if level < depth:
+            for i in range(fanout):
+                word = WORDS[(seed + i * 3) % len(WORDS)]
+                stack.append((os.path.join(path, f'{word}{i}'), level + 1, seed * fanout + i + 1))
+
+
+def top_paths(matches, terms):
+    top = search.TopK(search.MAX_RESULTS, terms)
+    for full, is_dir in matches:
+        top.push(full, is_dir)
+    return [full for full, _ in top.results()]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--scope')
+    ap.add_argument('--latency', type=float, default=50.0, help='ms before mdfind\'s first result')
+    ap.add_argument('--line-latency', type=float, default=0.0, help='ms per mdfind result line')
+    ap.add_argument('--read-caps', type=int, nargs='+', default=[1000, 5000, 20000])
+    ap.add_argument('--keep-caps', type=int, nargs='+', default=[100, 500, 2000])
+    ap.add_argument('queries', nargs='*')
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench-spotlight-')
+    try:
+        scope = os.path.abspath(os.path.expanduser(args.scope)) if args.scope else os.path.join(tmp, 'tree')
+        if not args.scope:
+            build_tree(scope)
+        db = os.path.join(tmp, 'paths.locate')
+        search_locate.build_db(scope, db)
+        os.environ.update({
+            'FAKE_MDFIND_DB': db,
+            'FAKE_MDFIND_LATENCY': str(args.latency),
+            'FAKE_MDFIND_LINE_LATENCY': str(args.line_latency),
+        })
+        search.MDFIND = FAKE_MDFIND
+
+        queries = [q.lower().split() for q in (args.queries or DEFAULT_QUERIES)]
+        truth = {
+            tuple(terms): set(top_paths(
+                search.search_walk(scope, terms, True, True, search.EngineOptions()), terms))
+            for terms in queries
+        }
+
+        print(f"{len(queries)} queries, mdfind latency {args.latency:g} ms + {args.line_latency:g} ms/line")
+        print(f"{'READ_CAP':>9} {'KEEP_CAP':>9} {'ms/query':>9} {'truncated':>10} {'recall':>7}")
+        for read_cap in args.read_caps:
+            for keep_cap in args.keep_caps:
+                search.SPOTLIGHT_READ_CAP = read_cap
+                search.SPOTLIGHT_KEEP_CAP = keep_cap
+                elapsed = 0.0
+                truncated = 0
+                found = expected = 0
+                for terms in queries:
+                    opts = search.EngineOptions()
+                    start = time.perf_counter()
+                    got = top_paths(search.search_spotlight(scope, terms, True, True, opts), terms)
+                    elapsed += time.perf_counter() - start
+                    truncated += bool(opts.status.get('truncated'))
+                    want = truth[tuple(terms)]
+                    found += len(want.intersection(got))
+                    expected += len(want)
+                recall = found / expected if expected else 1.0
+                print(f"{read_cap:>9} {keep_cap:>9} {elapsed / len(queries) * 1000:>9.1f} "
+                      f"{truncated:>5}/{len(queries):<4} {recall:>7.0%}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark search.py's walker on a simulated high-latency filesystem.
+
+Usage:
+    bench-walk.py [--latency MS] [--depth N] [--fanout N] [--files N] [--threads N ...]
+
+Builds a throwaway tree under a temp dir, then wraps os.scandir so every
+folder listing sleeps for --latency ms first — roughly what listing a folder
+costs on a spun-down external drive or a Dropbox CloudStorage mount. Each
+thread count walks the whole tree with search.walk_tree(); threads=1 is the
+old one-listing-at-a-time behavior. The walk output is compared across runs
+to confirm the parallel walker yields exactly the same entries in the same
+order.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utilities'))
+
+import search  # noqa: E402
+
+
+def build_tree(root, depth, fanout, files):
+    """A balanced tree: `fanout` folders per level, `files` files per folder."""
+    folders = 0
+    stack = [(root, 0)]
+    while stack:
+        path, level = stack.pop()
+        os.makedirs(path, exist_ok=True)
+        folders += 1
+        for i in range(files):
+            open(os.path.join(path, f'file-{level}-{i}.txt'), 'w').close()
+        if level < depth:
+            for i in range(fanout):
+                stack.append((os.path.join(path, f'dir-{level}-{i}'), level + 1))
+    return folders
+
+
+def slow_scandir(latency):
+    real = os.scandir
+
+    def scandir(path='.'):
+        time.sleep(latency)
+        return real(path)
+    return scandir
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--latency', type=float, default=20.0, help='ms per folder listing')
+    ap.add_argument('--depth', type=int, default=3)
+    ap.add_argument('--fanout', type=int, default=5)
+    ap.add_argument('--files', type=int, default=10)
+    ap.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench-walk-')
+    real_scandir = os.scandir
+    try:
+        folders = build_tree(root, args.depth, args.fanout, args.files)
+        print(f"Tree: {folders} folders, {folders * args.files} files, "
+              f"{args.latency:g} ms per listing")
+
+        os.scandir = slow_scandir(args.latency / 1000.0)
+        baseline = None
+        base_time = None
+        for threads in args.threads:
+            start = time.perf_counter()
+            entries = list(search.walk_tree(root, threads=threads))
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline, base_time = entries, elapsed
+            same = '✓' if entries == baseline else '✗ OUTPUT DIFFERS'
+            print(f"  threads={threads:<3} {elapsed * 1000:8.1f} ms  "
+                  f"{base_time / elapsed:5.1f}x  {len(entries)} entries {same}")
+    finally:
+        os.scandir = real_scandir
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
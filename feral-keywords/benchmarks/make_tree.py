@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Build deterministic synthetic folder trees for benchmarking search.py.
+
+Usage:
+    make_tree.py [--entries N] [--depth N] [--fanout N] [--names words|random|zipf]
+                 [--noise FRACTION] [--unicode FRACTION] [--seed N] "<root>"
+
+The same arguments always produce the same tree, byte for byte, so numbers
+measured on one machine (or one version of search.py) can be compared with
+another. --entries is the total number of files and folders to create, from a
+few thousand up to a million or so:
+
+  - Folders: `--fanout` per folder down to `--depth` levels (so the tree has
+    at most fanout + fanout² + ... folders), breadth-first until the entry
+    budget allows no more.
+  - Files: the rest of the budget, spread over the folders with a heavy-tailed
+    (Pareto) weighting — most folders hold a handful, a few hold thousands,
+    like real project and photo folders.
+  - Names: `words` builds them from a small vocabulary in mixed styles
+    (kebab, snake, camelCase, spaces, version and @2x suffixes); `zipf` draws
+    the words with a Zipf distribution, so a few words are very common and
+    short queries match a lot; `random` uses random letter strings.
+  - Noise: about --noise of the entries go into node_modules and .git folders
+    that search.py prunes — they cost listing time but must never show up in
+    results.
+  - Unicode: about --unicode of the names get accented or non-Latin words, half
+    of them in decomposed (NFD) form, as macOS filesystems hand them back.
+
+Files are empty. The stats (entry counts by kind) are printed as JSON.
+Also importable: bench-search.py calls build() directly.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import unicodedata
+
+WORDS = [
+    'feral', 'header', 'alpha', 'beta', 'docs', 'assets', 'img', 'notes', 'readme',
+    'index', 'report', 'invoice', 'draft', 'final', 'logo', 'banner', 'photo',
+    'backup', 'export', 'config', 'client', 'project', 'budget', 'meeting',
+    'design', 'mockup', 'icon', 'screen', 'video', 'audio', 'archive', 'test',
+]
+UNICODE_WORDS = ['café', 'résumé', 'naïve', 'über', 'señor', 'façade', 'smørrebrød',
+                 '日本語', 'фото', 'αρχείο', 'mañana', 'crème']
+EXTENSIONS = ['txt', 'md', 'pdf', 'png', 'jpg', 'psd', 'ai', 'mov', 'json', 'js',
+              'py', 'csv', 'zip', 'key', 'docx']
+SUFFIXES = ['', '', '', '', '-v2', '-final', '@2x', ' copy', '-2024', '_old']
+DEFAULT_ENTRIES = 10000
+
+
+class Namer:
+    """Deterministic name source; every name it hands out is unique per folder."""
+
+    def __init__(self, rng, style, unicode_ratio):
+        self.rng = rng
+        self.style = style
+        self.unicode_ratio = unicode_ratio
+        # Zipf-ish weights: word k is drawn with weight 1/k.
+        self.weights = [1.0 / (k + 1) for k in range(len(WORDS))]
+
+    def word(self):
+        rng = self.rng
+        if rng.random() < self.unicode_ratio:
+            word = rng.choice(UNICODE_WORDS)
+            form = 'NFD' if rng.random() < 0.5 else 'NFC'
+            return unicodedata.normalize(form, word)
+        if self.style == 'random':
+            return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10)))
+        if self.style == 'zipf':
+            return rng.choices(WORDS, self.weights)[0]
+        return rng.choice(WORDS)
+
+    def stem(self):
+        rng = self.rng
+        words = [self.word() for _ in range(rng.randint(1, 3))]
+        style = rng.randrange(4)
+        if style == 0:
+            stem = '-'.join(words)
+        elif style == 1:
+            stem = '_'.join(words)
+        elif style == 2:
+            stem = words[0] + ''.join(w[:1].upper() + w[1:] for w in words[1:])
+        else:
+            stem = ' '.join(words).capitalize()
+        if rng.random() < 0.3:
+            stem += f'-{rng.randint(1, 99):02d}'
+        return stem + rng.choice(SUFFIXES)
+
+    def file_name(self):
+        return f'{self.stem()}.{self.rng.choice(EXTENSIONS)}'
+
+    def folder_name(self):
+        return self.stem()
+
+
+def unique(name, taken):
+    """name, or name with a counter, whichever isn't in taken yet.
+
+    Compared case- and normalization-insensitively, as APFS and HFS+ do.
+    """
+    candidate = name
+    n = 2
+    while unicodedata.normalize('NFC', candidate).lower() in taken:
+        stem, dot, ext = name.rpartition('.')
+        candidate = f'{stem} {n}.{ext}' if dot and stem else f'{name} {n}'
+        n += 1
+    taken.add(unicodedata.normalize('NFC', candidate).lower())
+    return candidate
+
+
+def add_noise(path, rng, budget, stats):
+    """Fill a node_modules or .git folder under path with up to budget entries."""
+    made = 0
+    if rng.random() < 0.5:
+        base = os.path.join(path, 'node_modules')
+        os.makedirs(base, exist_ok=True)
+        made += 1
+        while made < budget:
+            pkg = os.path.join(base, f'{rng.choice(WORDS)}-{rng.randrange(10 ** 6):06d}')
+            os.makedirs(os.path.join(pkg, 'lib'), exist_ok=True)
+            made += 2
+            for name in ('package.json', 'index.js', 'lib/util.js', 'README.md'):
+                if made >= budget:
+                    break
+                open(os.path.join(pkg, name), 'w').close()
+                made += 1
+    else:
+        base = os.path.join(path, '.git', 'objects')
+        os.makedirs(base, exist_ok=True)
+        made += 2
+        while made < budget:
+            fan = os.path.join(base, f'{rng.randrange(256):02x}')
+            if not os.path.isdir(fan):
+                os.mkdir(fan)
+                made += 1
+            open(os.path.join(fan, f'{rng.getrandbits(152):038x}'), 'w').close()
+            made += 1
+    stats['noise'] += made
+    return made
+
+
+def build(root, entries=DEFAULT_ENTRIES, depth=5, fanout=6, names='words',
+          noise=0.1, unicode_ratio=0.02, seed=1):
+    """Create the tree under root (which must not exist yet); return its stats."""
+    rng = random.Random(seed)
+    namer = Namer(rng, names, unicode_ratio)
+    stats = {'folders': 0, 'files': 0, 'noise': 0}
+    noise_budget = int(entries * noise)
+    budget = entries - noise_budget
+
+    # Folders first, breadth-first, leaving most of the budget for files.
+    os.makedirs(root)
+    folders = [root]
+    taken = {root: set()}
+    level = [root]
+    folder_budget = max(1, budget // 8)
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for _ in range(rng.randint(1, 2 * fanout - 1)):
+                if stats['folders'] >= folder_budget:
+                    break
+                path = os.path.join(parent, unique(namer.folder_name(), taken[parent]))
+                os.mkdir(path)
+                taken[path] = set()
+                stats['folders'] += 1
+                next_level.append(path)
+        folders.extend(next_level)
+        level = next_level
+        if not level:
+            break
+
+    # Files, spread over the folders with heavy-tailed weights.
+    file_budget = budget - stats['folders']
+    weights = [rng.paretovariate(1.2) for _ in folders]
+    for folder in rng.choices(folders, weights, k=file_budget):
+        open(os.path.join(folder, unique(namer.file_name(), taken[folder])), 'w').close()
+        stats['files'] += 1
+
+    # Noise, in a few randomly chosen folders.
+    homes = rng.sample(folders, min(len(folders), max(1, noise_budget // 500))) if noise_budget else []
+    for i, home in enumerate(homes):
+        share = noise_budget // len(homes) + (1 if i < noise_budget % len(homes) else 0)
+        add_noise(home, rng, share, stats)
+
+    stats['entries'] = stats['folders'] + stats['files'] + stats['noise']
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--entries', type=int, default=DEFAULT_ENTRIES)
+    ap.add_argument('--depth', type=int, default=5)
+    ap.add_argument('--fanout', type=int, default=6, help='mean subfolders per folder')
+    ap.add_argument('--names', choices=['words', 'random', 'zipf'], default='words')
+    ap.add_argument('--noise', type=float, default=0.1, help='share of entries in node_modules/.git')
+    ap.add_argument('--unicode', type=float, default=0.02, help='share of names with non-ASCII words')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('root')
+    args = ap.parse_args()
+    if os.path.exists(args.root):
+        print(f"Already exists: {args.root}", file=sys.stderr)
+        sys.exit(1)
+    stats = build(args.root, args.entries, args.depth, args.fanout, args.names,
+                  args.noise, args.unicode, args.seed)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -23,10 +23,19 @@ UID_PNG_RE = re.compile(
 # Recursive-search shortcuts (CSV `mode` column) -> search.py engine/type flags.
 # Blank mode = plain open-the-folder behavior (handled separately).
 SEARCH_MODES = {
-    'search': '--engine walk --types files',        # small folders, exhaustive
+    'search': '--engine index --types files',       # exhaustive, incremental index
     'search-all': '--engine spotlight --types all',  # huge trees, fast, files+folders
+    'search-fuzzy': '--engine index --types all --match fuzzy',  # fzf-style, files+folders
+    'search-content': '--types content',  # grep file contents, matched line as subtitle
+    'search-archives': '--engine walk --types all --archives',  # also inside .zip/.alfredworkflow
 }
 
+# One extra keyword that searches every name-search scope above at once
+# (utilities/search-global.py). Content scopes are left out: grepping every
+# file of every scope can't fit in one keystroke's deadline.
+GLOBAL_SEARCH_KEYWORD = 'ff'
+GLOBAL_SEARCH_MODES = ('search', 'search-all', 'search-fuzzy', 'search-archives')
+
 def get_current_version():
     """Read current version from existing info.plist, or return default"""
     if os.path.exists('info.plist'):
@@ -168,23 +177,22 @@ def create_launch_file_object(path):
     }
 
 def create_smart_path_script(path1, path2=None):
-    """Create a bash script that opens the first existing path"""
+    """Create a bash script that opens the first existing path.
+
+    utilities/dropbox_paths.py picks it, so absent volumes are skipped
+    without waiting on them and Dropbox paths are also tried on this
+    machine's Dropbox layout.
+    """
     if not path2:
         # If no second path, just use the simple launch file object
         return None
 
-    script = f'''# Check which path exists and open it
+    script = f'''# Open whichever path exists on this machine
 path1="{path1}"
 path2="{path2}"
 
-# Expand tilde in paths
-path1="${{path1/#\\~/$HOME}}"
-path2="${{path2/#\\~/$HOME}}"
-
-if [ -e "$path1" ]; then
-    open "$path1"
-elif [ -e "$path2" ]; then
-    open "$path2"
+if path=$(/usr/bin/python3 ./utilities/dropbox_paths.py "$path1" "$path2"); then
+    open "$path"
 else
     osascript -e 'display notification "Neither path exists" with title "Path Not Found"'
 fi
@@ -293,11 +301,18 @@ def create_search_open_action():
     selected. The one exception is the bare-scope item search.py returns for an
     empty query, which sets open_folder=1: that opens the folder itself, since
     revealing it would select it in its parent instead.
+
+    Revealed matches are recorded in their scope's frecency store (search.py
+    sets search_scope on every match), which search.py ranks with and lists
+    for an empty query.
     """
     script = '''if [ "$open_folder" = "1" ]; then
     open "$1"
 else
     open -R "$1"
+    if [ -n "$search_scope" ]; then
+        /usr/bin/python3 ./utilities/search_frecency.py "$search_scope" "$1"
+    fi
 fi
 '''
     return create_script_object(script, script_type=0)  # 0 = bash
@@ -328,10 +343,16 @@ def build_workflow(new_version='2.0'):
             # Recursive search: a script filter that returns matches from the
             # folder, wired to a Reveal action so Return opens the match's
             # enclosing folder (file selected). The mode picks engine + types:
-            #   search      = walk + files  (small folders, exhaustive)
+            #   search      = index + files (exhaustive, incrementally re-listed)
             #   search-all  = spotlight + files & folders (huge trees, fast)
+            #   search-fuzzy = index + files & folders, fzf-style fuzzy matching
+            #   search-content = files whose contents hold the query (walks)
+            #   search-archives = walk + files & folders, and inside zip archives
+            # Results come progressively (partial list + Alfred rerun) for the
+            # walk modes and search-all; the index and content modes answer
+            # once, complete.
             flags = SEARCH_MODES[mode]
-            search_script = f'/usr/bin/python3 ./utilities/search.py {flags} "{shortcut["path"]}" "$1"'
+            search_script = f'/usr/bin/python3 ./utilities/search.py {flags} "{shortcut["path"]}" -- "$1"'
             input_obj = create_script_filter_object(
                 shortcut['keyword'],
                 shortcut['name'],
@@ -372,6 +393,36 @@ def build_workflow(new_version='2.0'):
 
         y_position += y_spacing
     
+    # Global search across every search-mode scope, if there are any
+    global_scopes = [
+        s for s in file_shortcuts
+        if (s.get('mode') or '').strip().lower() in GLOBAL_SEARCH_MODES
+    ]
+    if global_scopes:
+        scope_args = ' '.join(
+            f'"{s["name"]}" "{s["path"]}" "{SEARCH_MODES[s["mode"].strip().lower()]}"'
+            for s in global_scopes
+        )
+        search_script = f'/usr/bin/python3 ./utilities/search-global.py -- "$1" {scope_args}'
+        input_obj = create_script_filter_object(
+            GLOBAL_SEARCH_KEYWORD,
+            'Search Everywhere',
+            'Search every search shortcut\'s folder at once',
+            search_script,
+            get_icon_path(GLOBAL_SEARCH_KEYWORD),
+            alfred_filters=False
+        )
+        action_obj = create_search_open_action()
+
+        objects.append(input_obj)
+        objects.append(action_obj)
+        connections[input_obj['uid']] = [
+            create_connection(input_obj['uid'], action_obj['uid'])
+        ]
+        uidata[input_obj['uid']] = {'xpos': float(x_input), 'ypos': float(y_position)}
+        uidata[action_obj['uid']] = {'xpos': float(x_action), 'ypos': float(y_position)}
+        y_position += y_spacing
+
     # Process web shortcuts
     for shortcut in web_shortcuts:
         icon = get_icon_path(shortcut['keyword'])
@@ -480,7 +531,8 @@ def build_workflow(new_version='2.0'):
         'Search _FERAL',
         'Search files in _FERAL directory',
         f_script_content,
-        f_icon
+        f_icon,
+        alfred_filters=False
     )
     feral_open = create_open_file_action()
 
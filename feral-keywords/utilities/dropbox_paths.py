@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Find which machine's copy of a Dropbox path exists, without hanging on
+volumes that aren't there.
+
+Usage:
+    dropbox_paths.py "<path>" ["<path>" ...]
+
+Prints the first of the paths that exists, else the first that exists once
+remapped onto another Dropbox layout; exits 1 if none does. Workflow scripts
+call it instead of testing each path with `[ -e ]`:
+
+    if path=$(/usr/bin/python3 ./dropbox_paths.py "$path1" "$path2"); then
+        open "$path"
+    fi
+
+The same Dropbox shows up in different places on different machines: on the
+Feral SSD volume, or under ~/Library/CloudStorage. ROOT_GROUPS lists each
+Dropbox's possible roots, and a path under any one of them is also tried
+under the others (candidates()).
+
+Testing a path on an unmounted or sleeping /Volumes drive can stall for
+seconds, so roots are never statted in the foreground. A /Volumes root whose
+volume isn't in /Volumes is simply absent. The others are probed each in a
+background thread, and one that hasn't answered within PROBE_TIMEOUT counts
+as absent. Which roots are live is cached for LIVE_TTL seconds in a file
+shared by every workflow, so most runs probe nothing. Paths under a root
+that isn't live are skipped without being touched.
+
+Other workflows get this file through a symlink to it. package.sh's zip
+stores the file itself, so a packaged workflow carries its own copy.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Each Dropbox's roots, in order of preference.
+ROOT_GROUPS = [
+    (
+        "/Volumes/Feral SSD/Dropbox (Personal)",
+        "~/Library/CloudStorage/Dropbox-Personal",
+        "~/Library/CloudStorage/Dropbox-Personal1",
+        "~/Dropbox (Personal)",
+    ),
+    (
+        "/Volumes/Feral Storage/Cannonball Dropbox",
+        "~/Library/CloudStorage/Dropbox-Cannonball",
+    ),
+]
+PROBE_TIMEOUT = 0.3
+LIVE_TTL = 30
+STATE_FILE = os.path.join(tempfile.gettempdir(), f'feral-dropbox-roots-{os.getuid()}.json')
+
+
+def groups():
+    """ROOT_GROUPS with ~ expanded."""
+    return [[os.path.expanduser(root) for root in roots] for roots in ROOT_GROUPS]
+
+
+def split_root(path):
+    """(roots of path's group, its root, the rest of the path); (None, None, path)
+    if it's in no Dropbox."""
+    for roots in groups():
+        for root in roots:
+            if path == root or path.startswith(root + '/'):
+                return roots, root, path[len(root):].lstrip('/')
+    return None, None, path
+
+
+def candidates(*paths):
+    """Every place the paths may be, in order: the paths themselves, then each
+    one remapped onto the other roots of its Dropbox."""
+    found = [os.path.expanduser(p) for p in paths if p]
+    for path in list(found):
+        roots, _root, rest = split_root(path)
+        for root in roots or ():
+            found.append(os.path.join(root, rest) if rest else root)
+    return list(dict.fromkeys(found))
+
+
+def volume_mounted(root):
+    """False if root is on a /Volumes drive that isn't mounted. Listing
+    /Volumes doesn't touch the drives themselves."""
+    parts = root.split('/')
+    if len(parts) < 3 or parts[1] != 'Volumes':
+        return True
+    try:
+        return parts[2] in os.listdir('/Volumes')
+    except OSError:
+        return False
+
+
+def probe(roots, timeout=PROBE_TIMEOUT):
+    """{root: is live}, each root checked in its own thread. A root still
+    hanging after timeout counts as absent (its thread is left behind)."""
+    answers = {}
+
+    def check(root):
+        answers[root] = os.path.isdir(root)
+
+    threads = []
+    for root in roots:
+        if not volume_mounted(root):
+            answers[root] = False
+            continue
+        thread = threading.Thread(target=check, args=(root,), daemon=True)
+        thread.start()
+        threads.append(thread)
+    end = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, end - time.monotonic()))
+    return {root: answers.get(root, False) for root in roots}
+
+
+def load_state():
+    try:
+        with open(STATE_FILE) as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    """Atomically replace the shared state file; failures are ignored."""
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(STATE_FILE), prefix='.feral-roots-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, STATE_FILE)
+    except OSError:
+        pass
+
+
+def live_roots(now=None):
+    """The roots in ROOT_GROUPS that are there, probing only the ones whose
+    cached answer is older than LIVE_TTL."""
+    now = time.time() if now is None else now
+    state = load_state()
+    roots = [root for group in groups() for root in group]
+    stale = [root for root in roots
+             if not (isinstance(state.get(root), list) and now - state[root][1] < LIVE_TTL)]
+    if stale:
+        for root, live in probe(stale).items():
+            state[root] = [live, now]
+        save_state(state)
+    return {root for root in roots if state[root][0]}
+
+
+def existing(*paths):
+    """Yield the candidates that exist, skipping any under a root that isn't live."""
+    live = None
+    for path in candidates(*paths):
+        _roots, root, _rest = split_root(path)
+        if root is not None:
+            if live is None:
+                live = live_roots()
+            if root not in live:
+                continue
+        if os.path.exists(path):
+            yield path
+
+
+def resolve(*paths):
+    """The first of the paths (or their remaps) that exists, or None."""
+    return next(existing(*paths), None)
+
+
+def main():
+    path = resolve(*sys.argv[1:])
+    if path is None:
+        sys.exit(1)
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,106 +2,254 @@
 """
 Search files in _FERAL directory using Spotlight (mdfind)
 Returns Alfred Script Filter JSON results
+
+Usage: feral-search.py "<query>"
+
+The candidate dirs are mirrors of the same Dropbox folder, so the same file
+usually exists under more than one of them. A query is searched in every
+existing dir at once (search.py's Spotlight engine, one mdfind each, same
+terms and filters as the search shortcuts) and a relative path found under
+several dirs is listed once, from the first dir in CANDIDATE_DIRS order. All
+dirs share one DEADLINE: a dir that hasn't answered by then is left out
+rather than holding up the others.
+
+An empty query, or one with a slash in it, browses instead: "Westwood/assets/"
+lists that folder (merged across the dirs), and any text after the last slash
+narrows the listing to names containing it. Folder items autocomplete into
+the folder rather than opening it, so Return or Tab drills down; the first
+item of a listing opens the folder itself. Listings are cached across runs
+(DirListings) and keyed by the folder's mtime, so going back and forth costs
+one stat per folder, not a listing.
 """
 
 import os
 import sys
 import json
-import subprocess
-
-CANDIDATE_DIRS = [
-    "/Volumes/Feral SSD/Dropbox (Personal)/_FERAL",
-    os.path.expanduser("~/Library/CloudStorage/Dropbox-Personal/_FERAL"),
-    os.path.expanduser("~/Library/CloudStorage/Dropbox-Personal1/_FERAL"),
-]
-SEARCH_DIRS = [p for p in CANDIDATE_DIRS if os.path.isdir(p)]
-
-def get_file_icon(file_path):
-    """Get appropriate icon for file type"""
-    if os.path.isdir(file_path):
-        return {"type": "fileicon", "path": file_path}
-    else:
-        return {"type": "fileicon", "path": file_path}
+import queue
+import threading
+import time
 
-def search_files(query, max_results=200):
-    """Search files across all existing _FERAL directories using Spotlight.
+import dropbox_paths
+import search
+import search_icons
+import search_query
+import search_store
+
+FERAL_DIR = "/Volumes/Feral SSD/Dropbox (Personal)/_FERAL"
+# Its copy on every Dropbox layout, and the ones on this machine (skipping
+# absent volumes without waiting on them).
+CANDIDATE_DIRS = dropbox_paths.candidates(FERAL_DIR)
+SEARCH_DIRS = list(dropbox_paths.existing(FERAL_DIR))
+# Seconds all dirs together get to answer a query.
+DEADLINE = 1.0
+# Folders whose listings are kept between runs.
+MAX_LISTINGS = 2000
+# Folders Finder shows as files: listed and opened as such, not browsed into.
+PACKAGE_EXTENSIONS = {'.app', '.bundle', '.key', '.pages', '.numbers', '.rtfd',
+                      '.photoslibrary', '.fcpbundle', '.logicx', '.sketch'}
 
-    Iterates every candidate dir that exists on this machine; missing ones
-    are skipped silently. Per-directory errors are also swallowed so a
-    flaky volume doesn't break the whole search.
+def get_file_icon(file_path, icons=None, is_dir=None):
+    """Get appropriate icon for file type, from the icon cache when given one"""
+    if icons is not None:
+        return icons.icon(file_path, os.path.isdir(file_path) if is_dir is None else is_dir)
+    return {"type": "fileicon", "path": file_path}
+
+def is_folder(entry):
+    """True for a folder we browse into; packages count as files."""
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        return False
+    return is_dir and os.path.splitext(entry.name)[1].lower() not in PACKAGE_EXTENSIONS
+
+class DirListings:
+    """Folder listings cached between runs, each keyed by the folder's mtime.
+
+    Adding, removing or renaming an entry changes its folder's mtime, so a
+    listing is reused until the folder itself changes.
     """
-    if not SEARCH_DIRS:
-        return [{
-            "title": "No _FERAL directories found",
-            "subtitle": "Checked: " + ", ".join(CANDIDATE_DIRS),
-            "valid": False
-        }]
 
-    scored_results = []
-    seen_paths = set()
+    def __init__(self):
+        self.path = search_store.scope_file(CANDIDATE_DIRS[0], 'browse')
+        cached = search_store.load(self.path, {})
+        self.cache = cached if isinstance(cached, dict) else {}
+        self.changed = False
+
+    def entries(self, folder):
+        """(name, is_dir) for the folder's visible entries; None if it isn't one."""
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+        hit = self.cache.get(folder)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+        try:
+            with os.scandir(folder) as it:
+                entries = tuple((e.name, is_folder(e)) for e in it if not e.name.startswith('.'))
+        except OSError:
+            return None
+        # Re-inserted so the dict stays in least-recently-listed order.
+        self.cache.pop(folder, None)
+        self.cache[folder] = (mtime, entries)
+        self.changed = True
+        return entries
+
+    def save(self):
+        if not self.changed:
+            return
+        if len(self.cache) > MAX_LISTINGS:
+            self.cache = dict(list(self.cache.items())[-MAX_LISTINGS:])
+        search_store.save(self.path, self.cache)
 
+def browse(rel, narrow, listings):
+    """(folder, [(rel, full, is_dir), ...]) for the folder rel in every dir
+    that has it, each name once, keeping names containing narrow.
+
+    folder is the first dir's copy of it; (None, []) if no dir has it.
+    """
+    folder = None
+    found = {}
     for search_dir in SEARCH_DIRS:
+        path = os.path.join(search_dir, rel) if rel else search_dir
+        entries = listings.entries(path)
+        if entries is None:
+            continue
+        folder = folder or path
+        for name, is_dir in entries:
+            if narrow in name.lower() and name not in found:
+                found[name] = (os.path.join(rel, name), os.path.join(path, name), is_dir)
+    return folder, [found[name] for name in sorted(found, key=str.lower)]
+
+def parse_browse(query):
+    """(folder rel, narrowing text) for a browse query, or None for a search."""
+    if query.strip() and '/' not in query:
+        return None
+    folder, _, narrow = query.strip().rpartition('/')
+    parts = [p for p in folder.split('/') if p and p != '.']
+    if '..' in parts:
+        parts = []
+    return '/'.join(parts), narrow.lower()
+
+def query_dirs(parsed, deadline):
+    """{rel: (dir index, full, is_dir)} for what the dirs found by the deadline.
+
+    Each dir's engine runs in its own thread and feeds one queue; at the
+    deadline the rest is dropped and every engine is cancelled (which kills
+    its mdfind).
+    """
+    found = queue.Queue()
+    cancel = threading.Event()
+
+    def produce(index, search_dir):
+        opts = search.EngineOptions(query=parsed, cancel=cancel)
+        matches = search.search_spotlight(search_dir, parsed.terms, True, True, opts)
         try:
-            if not query or len(query) < 1:
-                for item in sorted(os.listdir(search_dir)):
-                    if item.startswith('.'):
-                        continue
-                    item_path = os.path.join(search_dir, item)
-                    if item_path in seen_paths:
-                        continue
-                    seen_paths.add(item_path)
-                    scored_results.append({
-                        "score": 0,
-                        "title": item,
-                        "subtitle": item,
-                        "arg": item_path,
-                        "type": "file",
-                        "icon": get_file_icon(item_path)
-                    })
-                continue
+            for full, is_dir in matches:
+                if cancel.is_set():
+                    return
+                found.put((index, search_dir, full, is_dir))
+        finally:
+            matches.close()
+            found.put(None)
+
+    for index, search_dir in enumerate(SEARCH_DIRS):
+        threading.Thread(target=produce, args=(index, search_dir), daemon=True).start()
 
-            cmd = [
-                'mdfind',
-                '-onlyin', search_dir,
-                f'kMDItemFSName == "*{query}*"c'
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-            if result.returncode != 0:
+    best = {}
+    running = len(SEARCH_DIRS)
+    try:
+        while running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = found.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                running -= 1
                 continue
+            index, search_dir, full, is_dir = item
+            rel = os.path.relpath(full, search_dir)
+            if rel not in best or index < best[rel][0]:
+                best[rel] = (index, full, is_dir)
+    finally:
+        cancel.set()
+    return best
 
-            for file_path in result.stdout.strip().split('\n'):
-                if not file_path or file_path in seen_paths:
-                    continue
-                if not os.path.exists(file_path):
-                    continue
-                filename = os.path.basename(file_path)
-                if filename.startswith('.'):
-                    continue
-                seen_paths.add(file_path)
-                depth = file_path.count('/') - search_dir.count('/')
-                rel_path = os.path.relpath(file_path, search_dir)
-                scored_results.append({
-                    "score": depth,
-                    "title": filename,
-                    "subtitle": rel_path,
-                    "arg": file_path,
-                    "type": "file",
-                    "icon": get_file_icon(file_path)
-                })
-        except (subprocess.TimeoutExpired, OSError):
-            continue
+def make_result(rel, full, is_dir, icons=None):
+    """An Alfred item; folders autocomplete into themselves instead of opening."""
+    item = {
+        "title": os.path.basename(full),
+        "subtitle": rel,
+        "arg": full,
+        "type": "file",
+        "icon": get_file_icon(full, icons, is_dir)
+    }
+    if is_dir:
+        item["title"] += "/"
+        item["autocomplete"] = rel + "/"
+        item["valid"] = False
+    return item
 
-    scored_results.sort(key=lambda x: (x['score'], x['title'].lower()))
+def search_files(query, max_results=200, icons=None, listings=None):
+    """Search files across all existing _FERAL directories using Spotlight.
+
+    Missing dirs are skipped silently, and so is a dir whose mdfind fails or
+    doesn't answer in time, so a flaky volume doesn't break the whole search.
+    Results are ranked like search.py's, on the path relative to its dir.
+    A browse query (see parse_browse) lists a folder instead.
+    """
+    if not SEARCH_DIRS:
+        return [{
+            "title": "No _FERAL directories found",
+            "subtitle": "Checked: " + ", ".join(CANDIDATE_DIRS),
+            "valid": False
+        }]
 
     results = []
-    for item in scored_results[:max_results]:
-        del item['score']
-        results.append(item)
+    browsing = parse_browse(query)
+    if browsing is not None:
+        rel, narrow = browsing
+        listings = listings or DirListings()
+        folder, found = browse(rel, narrow, listings)
+        listings.save()
+        if folder is None:
+            return [{
+                "title": "No such folder",
+                "subtitle": f"_FERAL/{rel} doesn't exist",
+                "valid": False
+            }]
+        found = found[:max_results]
+        if rel and not narrow:
+            results.append({
+                "title": f"Open {os.path.basename(rel)}",
+                "subtitle": f"_FERAL/{rel}",
+                "arg": folder,
+                "type": "file",
+                "icon": {"type": "fileicon", "path": folder}
+            })
+    else:
+        try:
+            parsed = search_query.Query(query)
+        except ValueError as e:
+            return [{"title": "Invalid filter", "subtitle": str(e), "valid": False}]
+        best = query_dirs(parsed, time.monotonic() + DEADLINE)
+        top = search.TopK(max_results, parsed.terms)
+        rels = {}
+        for rel, (_index, full, is_dir) in best.items():
+            rels[full] = rel
+            top.push(full, is_dir, key=search.rank_key(rel, parsed.terms))
+        # Spotlight can lag behind the disk: drop what's gone since.
+        found = [(rels[full], full, is_dir) for full, is_dir in search.verify_results(top.results())]
+
+    results.extend(make_result(rel, full, is_dir, icons) for rel, full, is_dir in found)
 
     if not results:
         return [{
             "title": "No results found",
-            "subtitle": "No files found in _FERAL",
+            "subtitle": f"Nothing in _FERAL matches “{query}”" if query.strip() else "No files found in _FERAL",
             "valid": False
         }]
 
@@ -110,15 +258,17 @@ def search_files(query, max_results=200):
 def main():
     """Main function
 
-    When alfredfiltersresults is enabled in the workflow, Alfred handles
-    the filtering. The script should return all results regardless of query.
+    Alfred passes the typed query as the only argument and shows the results
+    as they are (alfredfiltersresults is off): the script does the matching.
     """
-    # Ignore the query parameter - Alfred will filter the results
-    # We pass empty string to get all top-level items
-    results = search_files("")
+    query = sys.argv[1] if len(sys.argv) > 1 else ""
+    icons = search_icons.IconCache()
+    results = search_files(query, icons=icons)
 
     output = {"items": results}
     print(json.dumps(output))
+    sys.stdout.flush()
+    icons.flush()
 
 if __name__ == "__main__":
     main()
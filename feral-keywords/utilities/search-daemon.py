@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Long-lived index server for search.py.
+
+Usage:
+    search-daemon.py [--backend auto|inotify|poll] [--interval SECS] [scope ...]
+
+Watches every scope in ../shortcuts-files.csv whose `mode` is a search mode
+(plus any scopes given on the command line), keeps each one's index hot in
+memory, and answers search.py over a Unix domain socket (search.DAEMON_SOCKET).
+search.py falls back to its own engines whenever the socket isn't there, so the
+daemon is purely an accelerator — start it, stop it, nothing else changes.
+
+Change detection is pluggable. A backend watches directories and reports which
+ones changed; the daemon re-lists just those (search_index.relist_dir) and
+starts/stops watching the subdirectories that came and went:
+  inotify  - Linux, via ctypes; no third-party modules.
+  poll     - anywhere; periodically stats every known folder and re-lists the
+             ones whose mtime moved (search_index.refresh_index). This is what
+             macOS gets until an FSEvents backend is added alongside inotify.
+Either way, an edit to a .gitignore/.feralignore file in place (which leaves
+its folder's mtime alone) counts as a change too, so the rules are re-read.
+
+Queries are answered from one lowercased, newline-joined blob of relative paths
+per scope, rebuilt lazily after changes. str.find() scans that blob at C speed
+for the longest term, and only the lines it lands on are checked for the other
+terms, so hundreds of thousands of paths come back in single-digit ms.
+
+Protocol: one JSON request line in, one JSON reply out, then the connection
+closes. Request: {"scope", "terms", "files", "dirs", "match", "limit"}, where
+match is "substring" or "fuzzy" (search_fuzzy's matcher and score). Reply:
+{"ok": true, "matches": [[full_path, is_dir], ...]} ranked by search.rank_key,
+or {"ok": false, "error": ...} for a scope the daemon isn't watching.
+"""
+
+import argparse
+import bisect
+import csv
+import ctypes
+import ctypes.util
+import heapq
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import time
+
+import search
+import search_frecency
+import search_fuzzy
+import search_ignore
+import search_index
+import search_match
+
+CSV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shortcuts-files.csv')
+POLL_INTERVAL = 2.0
+
+
+def csv_scopes(csv_file=CSV_FILE):
+    """Expanded paths of every search-mode row in shortcuts-files.csv."""
+    scopes = []
+    try:
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if (row.get('mode') or '').strip().lower().startswith('search'):
+                    scopes.append(os.path.expanduser(row['path']))
+    except OSError:
+        pass
+    return scopes
+
+
+def normalize(scope):
+    return os.path.abspath(os.path.expanduser(scope)).rstrip(os.sep) or os.sep
+
+
+class InotifyBackend:
+    """Directory watches via Linux inotify, driven through ctypes."""
+
+    IN_MODIFY_NAMES = 0x40 | 0x80 | 0x100 | 0x200  # MOVED_FROM/TO, CREATE, DELETE
+    IN_WRITES = 0x02 | 0x08                        # MODIFY, CLOSE_WRITE
+    IN_SELF = 0x400 | 0x800                        # DELETE_SELF, MOVE_SELF
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x01000000
+    EVENT = struct.Struct('iIII')
+
+    timeout = None
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.paths = {}  # wd -> full dir path
+        self.wds = {}    # full dir path -> wd
+
+    def fileno(self):
+        return self.fd
+
+    def add(self, full):
+        mask = self.IN_MODIFY_NAMES | self.IN_WRITES | self.IN_SELF | self.IN_ONLYDIR
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(full), mask)
+        if wd >= 0:
+            self.paths[wd] = full
+            self.wds[full] = wd
+
+    def discard(self, full):
+        wd = self.wds.pop(full, None)
+        if wd is not None:
+            self.paths.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def changes(self):
+        """Full paths of directories whose listing changed, or None to rescan."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = self.EVENT.unpack_from(data, offset)
+                name = data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b'\0')
+                offset += self.EVENT.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                path = self.paths.get(wd)
+                if path is None:
+                    continue
+                if mask & self.IN_IGNORED:
+                    self.paths.pop(wd, None)
+                    self.wds.pop(path, None)
+                elif mask & self.IN_SELF:
+                    changed.add(os.path.dirname(path))
+                elif mask & self.IN_WRITES:
+                    # Writes only matter to the ignore rules.
+                    if os.fsdecode(name) in search_ignore.IGNORE_FILES:
+                        changed.add(path)
+                else:
+                    changed.add(path)
+        return changed
+
+
+class PollBackend:
+    """Portable fallback: ask for an mtime-driven rescan every interval."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.timeout = interval
+
+    def fileno(self):
+        return None
+
+    def add(self, full):
+        pass
+
+    def discard(self, full):
+        pass
+
+    def changes(self):
+        return None
+
+
+BACKENDS = {
+    'inotify': InotifyBackend,
+    'poll': PollBackend,
+}
+
+
+def make_backend(name, interval):
+    if name == 'auto':
+        name = 'inotify' if sys.platform.startswith('linux') else 'poll'
+    if name == 'poll':
+        return PollBackend(interval)
+    return BACKENDS[name]()
+
+
+class ScopeIndex:
+    """One watched scope: its index plus the flat blob queries scan."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.index = search_index.load_index(scope)
+        search_index.refresh_index(scope, self.index, search.keep_entry)
+        search_index.save_index(scope, self.index)
+        self.dirty = True
+        self.ignore_stamp = None
+        self.blob = ''
+        self.starts = []
+        self.rels = []
+        self.kinds = []
+
+    def full(self, rel):
+        return os.path.join(self.scope, rel) if rel else self.scope
+
+    def ignore_files_stamp(self):
+        """(path, mtime_ns) of every ignore file in the index, to spot edits
+        that don't touch their folder's mtime."""
+        stamp = []
+        for rel, record in self.index['dirs'].items():
+            for name in record[3]:
+                full = os.path.join(self.full(rel), name)
+                try:
+                    stamp.append((full, os.stat(full).st_mtime_ns))
+                except OSError:
+                    continue
+        return sorted(stamp)
+
+    def rebuild(self):
+        # What .gitignore/.feralignore files exclude is left out, as search.py's
+        # engines leave it out (it asks the daemon only when they would).
+        self.ignore_stamp = self.ignore_files_stamp()
+        rules = search_index.ignore_rules(self.scope, self.index)
+        rels = []
+        kinds = []
+        for rel, is_dir in search_index.iter_entries(self.index):
+            if search_index.ignored(rules, rel, is_dir):
+                continue
+            rels.append(rel)
+            kinds.append(is_dir)
+        # Offsets come from the lowercased lines themselves — lower() can
+        # change a string's length for some non-ASCII characters.
+        lowered = [rel.lower() for rel in rels]
+        starts = []
+        pos = 0
+        for line in lowered:
+            starts.append(pos)
+            pos += len(line) + 1
+        starts.append(pos)  # sentinel: start of the line after the last
+        self.blob = '\n'.join(lowered) + '\n'
+        self.starts = starts
+        self.rels = rels
+        self.kinds = kinds
+        self.dirty = False
+
+    def query(self, terms, want_files, want_dirs, limit):
+        if self.dirty:
+            self.rebuild()
+        blob, starts, find = self.blob, self.starts, self.blob.find
+        needle = max(terms, key=len)
+        others = search_match.compile([t for t in terms if t is not needle])
+        hits = []
+        pos = find(needle)
+        while pos != -1:
+            line = bisect.bisect_right(starts, pos) - 1
+            end = starts[line + 1]
+            if not (want_dirs if self.kinds[line] else want_files):
+                pos = find(needle, end)
+                continue
+            hay = blob[starts[line]:end - 1]
+            if others(hay):
+                hits.append((self.full(self.rels[line]), self.kinds[line]))
+            pos = find(needle, end)
+        # The full path breaks ties, as in search.TopK, so equal scores come
+        # back in the same order as from search.py's own engines.
+        boosts = search_frecency.boosts(self.scope)
+        return heapq.nsmallest(limit, hits, key=lambda pair: search.rank_key(
+            pair[0], terms, boost=boosts.get(pair[0], 0)) + (pair[0],))
+
+    def query_fuzzy(self, terms, want_files, want_dirs, limit):
+        """Same as query(), with fuzzy matching: one regex pass over the blob."""
+        if self.dirty:
+            self.rebuild()
+        starts = self.starts
+        hits = []
+        for m in search_fuzzy.line_regex(tuple(terms)).finditer(self.blob):
+            line = bisect.bisect_right(starts, m.start()) - 1
+            is_dir = self.kinds[line]
+            if not (want_dirs if is_dir else want_files):
+                continue
+            full = self.full(self.rels[line])
+            score = search_fuzzy.score(terms, self.rels[line])
+            hits.append((search.fuzzy_rank_key(full, score), full, is_dir))
+        return [(full, is_dir) for _key, full, is_dir in heapq.nsmallest(limit, hits)]
+
+
+class Daemon:
+    def __init__(self, scopes, backend, sock_path):
+        self.backend = backend
+        self.sock_path = sock_path
+        self.scopes = {}
+        for scope in scopes:
+            scope = normalize(scope)
+            if scope in self.scopes or not os.path.isdir(scope):
+                continue
+            self.scopes[scope] = ScopeIndex(scope)
+            for rel in self.scopes[scope].index['dirs']:
+                backend.add(self.scopes[scope].full(rel))
+
+    def owner(self, full):
+        """(ScopeIndex, rel) for a watched directory path, or (None, None)."""
+        for scope, state in self.scopes.items():
+            if full == scope:
+                return state, ''
+            if full.startswith(scope + os.sep):
+                return state, full[len(scope) + 1:]
+        return None, None
+
+    def apply_changes(self):
+        changed = self.backend.changes()
+        if changed is None:
+            for state in self.scopes.values():
+                before = set(state.index['dirs'])
+                if search_index.refresh_index(state.scope, state.index, search.keep_entry):
+                    state.dirty = True
+                elif state.ignore_stamp is not None and state.ignore_stamp != state.ignore_files_stamp():
+                    state.dirty = True
+                    after = set(state.index['dirs'])
+                    for rel in before - after:
+                        self.backend.discard(state.full(rel))
+                    for rel in after - before:
+                        self.backend.add(state.full(rel))
+            return
+        for full in sorted(changed):
+            state, rel = self.owner(full)
+            if state is None or rel not in state.index['dirs']:
+                continue
+            added, removed = search_index.relist_dir(state.scope, state.index, rel, search.keep_entry)
+            for r in removed:
+                self.backend.discard(state.full(r))
+            # Anything created inside a new folder between listing it and
+            # watching it raised no event, so list new folders once more after
+            # the watch is in place (and so on for any folders that turns up).
+            while added:
+                for r in added:
+                    self.backend.add(state.full(r))
+                relisted = []
+                for r in added:
+                    relisted += search_index.relist_dir(state.scope, state.index, r, search.keep_entry)[0]
+                added = relisted
+            state.dirty = True
+
+    def answer(self, conn):
+        try:
+            conn.settimeout(1.0)
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+            request = json.loads(data)
+            state = self.scopes.get(normalize(request['scope']))
+            terms = [t.lower() for t in request.get('terms', []) if t]
+            if state is None or not terms:
+                reply = {"ok": False, "error": "scope not watched"}
+            else:
+                query = state.query_fuzzy if request.get('match') == 'fuzzy' else state.query
+                matches = query(
+                    terms,
+                    bool(request.get('files', True)),
+                    bool(request.get('dirs', False)),
+                    int(request.get('limit', search.MAX_RESULTS)),
+                )
+                reply = {"ok": True, "matches": matches}
+            conn.sendall(json.dumps(reply).encode('utf-8'))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        finally:
+            conn.close()
+
+    def serve(self):
+        try:
+            os.unlink(self.sock_path)
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.sock_path)
+        os.chmod(self.sock_path, 0o600)
+        server.listen(16)
+
+        sel = selectors.DefaultSelector()
+        sel.register(server, selectors.EVENT_READ, 'client')
+        if self.backend.fileno() is not None:
+            sel.register(self.backend.fileno(), selectors.EVENT_READ, 'fs')
+
+        # Treat SIGTERM (launchd, kill) like Ctrl-C so the socket is removed.
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        print(f"Watching {len(self.scopes)} scope(s) on {self.sock_path}", file=sys.stderr)
+        next_poll = time.monotonic() + (self.backend.timeout or 0)
+        try:
+            while True:
+                timeout = None
+                if self.backend.timeout is not None:
+                    timeout = max(0.0, next_poll - time.monotonic())
+                for key, _ in sel.select(timeout):
+                    if key.data == 'client':
+                        conn, _ = server.accept()
+                        self.answer(conn)
+                    else:
+                        self.apply_changes()
+                if self.backend.timeout is not None and time.monotonic() >= next_poll:
+                    self.apply_changes()
+                    next_poll = time.monotonic() + self.backend.timeout
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            try:
+                os.unlink(self.sock_path)
+            except OSError:
+                pass
+            for state in self.scopes.values():
+                search_index.save_index(state.scope, state.index)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--backend', choices=['auto', *BACKENDS], default='auto')
+    ap.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                    help='seconds between rescans for the poll backend')
+    ap.add_argument('--socket', default=search.DAEMON_SOCKET)
+    ap.add_argument('scopes', nargs='*')
+    args = ap.parse_args()
+
+    scopes = csv_scopes() + [os.path.expanduser(s) for s in args.scopes]
+    backend = make_backend(args.backend, args.interval)
+    Daemon(scopes, backend, args.socket).serve()
+
+
+if __name__ == "__main__":
+    main()
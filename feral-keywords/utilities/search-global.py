@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Search every search shortcut's folder at once and return one Alfred list.
+
+Usage:
+    search-global.py [--deadline MS] -- "<query>" "<name>" "<scope>" "<search.py flags>" [...]
+
+build-workflow.py generates the call: one (name, scope, flags) triple per
+search-mode row of shortcuts-files.csv, with the flags its mode maps to, after
+a `--` so that a query like `-draft` isn't read as an option. Each
+scope is searched by its own search.py process, all of them concurrently, so
+every scope keeps its configured engine (and its daemon, prefix cache and
+resume cursor). The results are merged into one list, ranked by rank_key on
+the path relative to its scope — a match at the top of a deep scope isn't
+penalized for how deep the scope itself sits — with that scope's frecency
+boosts, and with the scope's name in each subtitle.
+
+All scopes share one deadline. Each search.py is given a --budget that ends
+just before it, so the walk engine checkpoints and answers in time, and
+--hard-budget, so Spotlight answers with what it has rather than asking for a
+rerun that would run past the deadline; whatever still hasn't answered at the deadline (a slow Spotlight, a sleeping drive) is
+killed and left out, rather than holding up the scopes that were fast. When a
+scope asked Alfred to rerun it (its walk isn't finished), so does this list.
+
+An empty query lists the scopes themselves, each opening its folder.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+import search
+import search_frecency
+import search_query
+import search_resume
+
+SEARCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search.py')
+DEADLINE = 1.0
+# Kept back from each search.py's budget for its own start-up and output.
+STARTUP_MARGIN = 0.25
+
+
+def start_search(scope, flags, query, budget):
+    cmd = [sys.executable, SEARCH] + shlex.split(flags) + [
+        '--budget', str(max(1, int(budget * 1000))), '--hard-budget', scope, '--', query]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+
+def collect(procs, deadline):
+    """(name, scope, reply) for each search that answered by the deadline,
+    and the names of the ones that didn't (they're killed, along with any
+    resume cursor they were working from, so the next run starts afresh)."""
+    replies = []
+    late = []
+    for name, scope, proc in procs:
+        try:
+            out, _ = proc.communicate(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            # Past the deadline (maybe waiting on an earlier scope): keep what
+            # has finished meanwhile, kill the rest.
+            if proc.poll() is None:
+                proc.kill()
+                proc.communicate()
+                search_resume.clear(scope)
+                late.append(name)
+                continue
+            out, _ = proc.communicate()
+        try:
+            replies.append((name, scope, json.loads(out)))
+        except ValueError:
+            continue
+    return replies, late
+
+
+def merge(replies, terms):
+    """Every scope's real results as one list, best first, scope in the subtitle.
+
+    Scopes can nest (~/www holds ~/www/onlyziads.com/wtf), so a path found
+    by several is kept once, from the most specific (longest) scope.
+    """
+    best = {}
+    for order, (name, scope, reply) in enumerate(replies):
+        boosts = search_frecency.boosts(scope)
+        for item in reply.get('items', []):
+            if item.get('valid') is False or 'arg' not in item:
+                continue
+            arg = item['arg']
+            if arg in best and len(best[arg][0]) >= len(scope):
+                continue
+            rel = os.path.relpath(arg, scope)
+            item['subtitle'] = f"{name} › {item.get('subtitle') or rel}"
+            key = search.rank_key(rel, terms, boost=boosts.get(arg, 0))
+            best[arg] = (scope, (key, order, rel, item))
+    ranked = sorted((entry for _scope, entry in best.values()), key=lambda r: r[:3])
+    return [item for *_key, item in ranked[:search.MAX_RESULTS]]
+
+
+def scope_items(scopes):
+    return [{
+        "title": name,
+        "subtitle": f"{scope} — or type to search every folder",
+        "arg": scope,
+        "type": "file",
+        "icon": {"type": "fileicon", "path": scope},
+        "variables": {"open_folder": "1"},
+    } for name, scope, _flags in scopes]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--deadline', type=int, default=int(DEADLINE * 1000),
+                    help='ms before slow scopes are cut off')
+    ap.add_argument('query')
+    ap.add_argument('scopes', nargs='*', help='name, scope, flags triples')
+    args = ap.parse_args()
+    if len(args.scopes) % 3:
+        ap.error('scopes come in (name, scope, flags) triples')
+    started = time.monotonic()
+    deadline = started + args.deadline / 1000.0
+
+    scopes = []
+    for i in range(0, len(args.scopes), 3):
+        name, scope, flags = args.scopes[i:i + 3]
+        scope = os.path.expanduser(scope)
+        if os.path.isdir(scope):
+            scopes.append((name, scope, flags))
+
+    query = args.query.strip()
+    if not query:
+        search.emit(scope_items(scopes) or [{"title": "No search folders found", "valid": False}])
+        return
+
+    # Rank on the terms alone: ext:/in:/… filters and -terms match no name.
+    try:
+        terms = search_query.Query(query).terms
+    except ValueError as e:
+        search.emit([{"title": "Invalid filter", "subtitle": str(e), "valid": False}])
+        return
+
+    budget = max(0.001, deadline - time.monotonic() - STARTUP_MARGIN)
+    procs = [(name, scope, start_search(scope, flags, query, budget)) for name, scope, flags in scopes]
+    replies, late = collect(procs, deadline)
+
+    items = merge(replies, terms)
+    rerun = search.RERUN_INTERVAL if any(reply.get('rerun') for *_s, reply in replies) else None
+    if late:
+        items.append({
+            "title": "Some folders took too long",
+            "subtitle": "Left out: " + ', '.join(late),
+            "valid": False,
+        })
+    if not items:
+        search.emit([{"title": "No matches", "subtitle": f"Nothing matching “{query}” in any search folder", "valid": False}], rerun)
+        return
+    search.emit(items, rerun)
+
+
+if __name__ == "__main__":
+    main()
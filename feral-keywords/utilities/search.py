@@ -3,34 +3,201 @@
 Recursively search a folder and return Alfred Script Filter JSON.
 
 Usage:
-    search.py [--engine walk|spotlight] [--types files|dirs|all] "<scope>" "<query>"
+    search.py [--engine walk|index|locate|spotlight|hybrid] [--types files|dirs|all|content]
+              [--match substring|fuzzy] [--trigrams] [--no-ignore] [--budget MS [--hard-budget]]
+              "<scope>" -- "<query>"
 
-Two engines:
+The `--` keeps a query that starts with a dash (`-draft`) from being read as
+an option.
+
+Engines register themselves with @engine (see its docstring for the contract)
+and are picked with --engine:
   walk       - os.walk the tree in-process. Exhaustive (no Spotlight gaps) but
-               O(tree size); good for modest folders.
+               O(tree size); good for modest folders. Never enters what
+               .gitignore/.feralignore files exclude (search_ignore.py) unless
+               --no-ignore is given.
+  index      - same results as walk, answered from an on-disk
+               index of the scope (see search_index.py). Each run only
+               re-lists directories whose mtime changed since the last one, so
+               repeat keystrokes cost a stat per folder instead of a full walk.
+               --trigrams adds a trigram posting-list index beside it, so terms
+               of 3+ characters only verify the paths that could possibly
+               contain them.
+  locate     - a locate-style front-coded path database (search_locate.py),
+               rebuilt out of band. No filesystem access at query time; results
+               are as fresh as the last rebuild.
   spotlight  - mdfind (Spotlight index). Effectively instant regardless of tree
                size; the only sane choice for very large trees, at the cost of
-               whatever Spotlight hasn't indexed.
+               whatever Spotlight hasn't indexed. $FERAL_MDFIND swaps in another
+               mdfind, e.g. ../benchmarks/fake-mdfind/mdfind off macOS.
+  hybrid     - spotlight and walk raced in parallel, merged as they stream in,
+               answering when both finish or the budget runs out. Spotlight-speed
+               answers that still include files only the walker can find.
+
+Whatever the engine, search.py first asks search-daemon.py over its Unix socket.
+When the daemon is running and watching the scope it answers from a hot
+in-memory index in a few milliseconds; otherwise the connect fails instantly.
+Next it checks the prefix cache (search_cache.py): when the query narrows one
+from a recent keystroke, the earlier candidate list is filtered instead of
+searching again. Only then does the chosen engine run. The daemon honours
+ignore files, so --no-ignore runs skip it.
+
+Each run gets --budget ms. The walk engine stops at the budget, answers with
+the best matches so far plus Alfred's `rerun` key, and leaves a cursor
+(search_resume.py) so the rerun continues the walk rather than restarting it:
+on huge trees results appear at once and fill in over a few reruns.
+Spotlight answers with what mdfind has streamed by the budget plus `rerun`
+too, but mdfind can't resume: its one rerun searches again without a budget.
+With --hard-budget (a caller that stops waiting at the budget) it just
+answers with what it has.
+The index, locate and content searches always run to the end, and hybrid
+drops whatever hasn't arrived by the budget.
 
-The query is split on whitespace into terms; every term must match (AND). Each
-result's arg is the full path so a downstream Reveal-in-Finder action opens the
-match's enclosing folder with it selected. An empty query returns the scope
+The query is split on whitespace into terms; every term must match (AND) — as
+a substring by default, or as an in-order subsequence with `--match fuzzy`,
+which also ranks by an fzf-style score (see search_fuzzy.py). Filters narrow
+it further — ext:pdf, in:assets, modified:<7d, size:>10m, -draft (see
+search_query.py); every engine applies them before matching terms, and the
+walk engine checks modified:/size: against the stat its listing took. Queries
+with filters skip the daemon, which only knows terms. `--types content`
+matches file contents instead of names (search_content.py), with the matched
+line as each result's subtitle; it always walks the tree. Each result's arg
+is the full path so a downstream Reveal-in-Finder action opens the match's
+enclosing folder with it selected. An empty query returns the scope
 itself, flagged with the open_folder variable so it opens rather than reveals.
 """
 
 import argparse
+import heapq
 import json
 import os
+import queue
+import signal
+import stat
 import subprocess
 import sys
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+# Left out here and imported where they're used: concurrent.futures (the walk,
+# verify_results), socket (query_daemon), search_content and search_locate
+# (their searches), and zipfile (inside search_archive). An empty query — the
+# frecency list — needs none of them, and shouldn't pay tens of ms for them.
+import search_archive
+import search_cache
+import search_frecency
+import search_fuzzy
+import search_icons
+import search_ignore
+import search_index
+import search_match
+import search_query
+import search_resume
 
 MAX_RESULTS = 100
 # Path segments we never want in results.
 SKIP_SEGMENTS = {'node_modules', '.git', '.svn'}
+# Where search-daemon.py listens. Deliberately not under the workflow cache
+# folder: the daemon is usually started outside Alfred (no
+# $alfred_workflow_cache), and AF_UNIX paths are capped at ~104 bytes on macOS.
+DAEMON_SOCKET = os.environ.get('FERAL_SEARCH_SOCKET') or f'/tmp/feral-search-{os.getuid()}.sock'
+DAEMON_TIMEOUT = 0.5
+# Concurrent folder listings in the walk engine. Listing is latency-bound on
+# external and CloudStorage volumes, so this is about overlapping waits, not CPU.
+WALK_THREADS = 8
+# Candidates per regex pass in fuzzy mode (see search_fuzzy.score_batch).
+FUZZY_BATCH = 4096
+# Spotlight stream bounds: raw mdfind lines read, and post-filter matches kept.
+# Module-level so benchmarks/bench-spotlight.py can tune them off macOS.
+SPOTLIGHT_READ_CAP = 20000
+SPOTLIGHT_KEEP_CAP = 500
+# Seconds a run may search before answering with what it has (--budget): the
+# hybrid engine stops waiting, the walk engine checkpoints and asks Alfred
+# to rerun it after RERUN_INTERVAL seconds to pick up where it left off, and
+# spotlight asks for a rerun that searches again to the end.
+BUDGET = 0.3
+RERUN_INTERVAL = 0.1
+MDFIND = os.environ.get('FERAL_MDFIND') or 'mdfind'
+# How often a running mdfind is checked against its deadline and cancel flag.
+MDFIND_WATCH_INTERVAL = 0.02
+# kMDItemContentType values that are folders to us. Packages (.app, .key,
+# ...) are directories on disk but files to Finder, and show as files.
+FOLDER_TYPES = {'public.folder', 'public.volume'}
+
+# --engine name -> (search function, whether it yields shallowest-first,
+#                   whether its paths are known to exist).
+ENGINES = {}
+
+
+def engine(name, depth_ordered=False, verified=True):
+    """Register a search function as `--engine name`.
+
+    Every engine is called as fn(scope, terms, want_files, want_dirs, opts)
+    and returns or yields (full_path, is_dir) matches. In fuzzy mode
+    (opts.fuzzy) it should hand over every candidate, or at most pre-filter
+    loosely — rank_fuzzy() does the real matching. An engine that had to cut
+    its results short sets opts.status['truncated'] so they aren't cached as
+    complete. depth_ordered engines yield shallower paths before deeper ones,
+    which lets main() stop them early.
+
+    Engines answering from an index that can lag the filesystem (Spotlight)
+    register verified=False: they may yield paths that are gone, and None for
+    is_dir when they can't tell, and main() stats just the final results
+    (verify_results) rather than the engine statting every candidate.
+    """
+    def register(fn):
+        ENGINES[name] = (fn, depth_ordered, verified)
+        return fn
+    return register
+
+
+class EngineOptions:
+    """Per-run settings handed to every engine, plus a status dict it can report into.
+
+    cancel is set when nobody wants more results (a deadline passed); engines
+    that run long or use threads should check it and wind down. deadline (a
+    time.monotonic() value, or None) is when a resumable engine should stop and
+    report a cursor in status['cursor']; resume is the cursor it left last time.
+    hard_deadline says nobody waits past deadline, even on a rerun, so an
+    engine that can only start over (spotlight) shouldn't ask for one.
+    """
+
+    def __init__(self, fuzzy=False, trigrams=False, ignore=True, query=search_query.EMPTY,
+                 cancel=None, deadline=None, resume=None, archives=False, hard_deadline=False):
+        self.fuzzy = fuzzy
+        self.trigrams = trigrams
+        self.ignore = ignore
+        self.query = query
+        self.archives = archives
+        self.cancel = cancel or threading.Event()
+        self.deadline = deadline
+        self.resume = resume
+        self.hard_deadline = hard_deadline
+        self.status = {}
+
+    def child(self):
+        """Same settings and cancel flag, but a status (and no cursor) of its own."""
+        return EngineOptions(self.fuzzy, self.trigrams, self.ignore, self.query, self.cancel,
+                             archives=self.archives)
+
+
+class Terminated(Exception):
+    """Raised in the main thread when Alfred terminates the run (SIGTERM)."""
 
 
-def emit(items):
-    print(json.dumps({"items": items}))
+def name_matcher(terms, opts):
+    """The compiled check an engine runs on each lowercased relative path: the
+    terms (none in fuzzy mode, which matches later) and the query's -terms."""
+    return search_match.compile([] if opts.fuzzy else terms, opts.query.negated)
+
+
+def emit(items, rerun=None):
+    out = {"items": items}
+    if rerun:
+        out["rerun"] = rerun
+    print(json.dumps(out))
 
 
 def is_skipped(rel_parts):
@@ -38,7 +205,23 @@ def is_skipped(rel_parts):
     return any(p in SKIP_SEGMENTS or p.startswith('.') for p in rel_parts)
 
 
-def make_item(full, scope, is_dir):
+def keep_entry(name, is_dir):
+    """False for dotfiles/dotdirs and junk dirs — the walk engine's pruning."""
+    if name.startswith('.'):
+        return False
+    return not (is_dir and name in SKIP_SEGMENTS)
+
+
+def make_item(full, scope, is_dir, icons=None):
+    """An Alfred item for a match; icons is the run's search_icons.IconCache."""
+    archive, member = search_archive.split(full)
+    if member is not None:
+        # Something inside an archive: listed as such, but Return reveals
+        # the archive itself.
+        item = make_item(archive, scope, False, icons)
+        item["title"] = os.path.basename(member) + ('/' if is_dir else '')
+        item["subtitle"] = f"{item['subtitle']} › {member}"
+        return item
     rel = os.path.relpath(full, scope)
     name = os.path.basename(full.rstrip('/'))
     return {
@@ -46,54 +229,391 @@ def make_item(full, scope, is_dir):
         "subtitle": rel,
         "arg": full,
         "type": "file",
-        "icon": {"type": "fileicon", "path": full},
+        "icon": icons.icon(full, is_dir) if icons else {"type": "fileicon", "path": full},
+        # For the Reveal action, which records what's opened (search_frecency).
+        "variables": {"search_scope": scope},
     }
 
 
-def rank_key(full, terms):
-    name = os.path.basename(full.rstrip('/')).lower()
+def rank_key(full, terms, name=None, boost=0):
+    """Sort key: all terms in the basename first, then shallow, then short.
+
+    boost (search_frecency.boosts()) counts a path often opened as that many
+    folder levels shallower than it is.
+    """
+    if name is None:
+        name = os.path.basename(full.rstrip('/')).rpartition(search_archive.MEMBER_SEP)[2]
+    name = name.lower()
     in_name = all(t in name for t in terms)
-    depth = full.rstrip('/').count(os.sep)
+    depth = full.rstrip('/').count(os.sep) - boost
     return (0 if in_name else 1, depth, len(name), name)
 
 
-def search_walk(scope, terms, want_files, want_dirs):
+def fuzzy_rank_key(full, score, name=None):
+    """Sort key for fuzzy mode: best score first, then shallow, then short."""
+    if name is None:
+        name = os.path.basename(full.rstrip('/')).rpartition(search_archive.MEMBER_SEP)[2]
+    name = name.lower()
+    return (-score, full.rstrip('/').count(os.sep), len(name), name)
+
+
+class _Ranked:
+    """Heap entry ordered worst-first, so heap[0] is the one to evict."""
+    __slots__ = ('key', 'full', 'is_dir')
+
+    def __init__(self, key, full, is_dir):
+        self.key = key
+        self.full = full
+        self.is_dir = is_dir
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+
+class TopK:
+    """The best `size` matches seen so far, by rank_key.
+
+    Matches are ranked once, as they arrive, into a bounded heap — memory stays
+    at `size` entries however many paths match, and nothing is ever sorted
+    beyond that. The full path is appended to each key as a final tiebreak so
+    the result doesn't depend on the order engines produce matches in.
+    boosts are the scope's frecency boosts, passed on to rank_key.
+    """
+
+    def __init__(self, size, terms, boosts=None):
+        self.size = size
+        self.terms = terms
+        self.boosts = boosts or {}
+        self.max_boost = max(self.boosts.values(), default=0)
+        self.heap = []
+        self.seen = set()
+
+    def push(self, full, is_dir, name=None, key=None):
+        """Offer a match. Returns False once nothing at least this deep can rank.
+
+        rank_key orders by (not-all-terms-in-name, depth, ...), so when the heap
+        is full and even its worst entry has every term in its name at a
+        shallower depth than this match, no later match from a shallow-first
+        (breadth-first) source can displace anything — the caller can stop.
+        Later matches may be boosted, so "shallower" allows for the biggest
+        boost. A caller passing its own key (fuzzy scores) must ignore the
+        result.
+        """
+        if full in self.seen:
+            return True
+        self.seen.add(full)
+        boost = 0
+        if key is None:
+            boost = self.boosts.get(full, 0)
+            key = rank_key(full, self.terms, name, boost)
+        key += (full,)
+        heap = self.heap
+        if len(heap) < self.size:
+            heapq.heappush(heap, _Ranked(key, full, is_dir))
+            return True
+        worst = heap[0].key
+        if key < worst:
+            heapq.heapreplace(heap, _Ranked(key, full, is_dir))
+            worst = heap[0].key
+        return not (worst[0] == 0 and worst[1] < key[1] + boost - self.max_boost)
+
+    def results(self):
+        """(full, is_dir) pairs, best first."""
+        return [(r.full, r.is_dir) for r in sorted(self.heap, key=lambda r: r.key)]
+
+
+def list_entries(path, stats=False):
+    """One folder's (name, full, is_dir, is_symlinked_dir, stat), sorted by name.
+
+    Type info comes from the DirEntry itself (d_type), so listing a folder
+    costs no per-entry stat on filesystems that report types. With stats, each
+    entry's DirEntry.stat() is taken too (free on some platforms, one call on
+    the listing thread otherwise); without, stat is None. Unreadable folders
+    list as empty, the same as os.walk's default.
+    """
     out = []
-    for root, dirs, files in os.walk(scope):
-        dirs[:] = [d for d in dirs if d not in SKIP_SEGMENTS and not d.startswith('.')]
-        candidates = []
-        if want_dirs:
-            candidates += [(os.path.join(root, d), True) for d in dirs]
-        if want_files:
-            candidates += [(os.path.join(root, f), False) for f in files if not f.startswith('.')]
-        for full, is_dir in candidates:
-            hay = os.path.relpath(full, scope).lower()
-            if all(t in hay for t in terms):
-                out.append((full, is_dir))
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                    st = entry.stat() if stats else None
+                except OSError:
+                    continue
+                out.append((entry.name, entry.path, is_dir, is_dir and entry.is_symlink(), st))
+    except OSError:
+        return []
+    out.sort()
     return out
 
 
-def mdfind_stream(scope, expr, read_cap):
-    """Yield raw paths from a streaming mdfind, bounded to read_cap lines.
+def list_folder(path, rel_root, rules, stats, listed=None):
+    """(list_entries(path, stats), the ignore rules in force inside the folder,
+    the folder's mtime_ns or None).
+
+    Runs on the walker's pool, so reading and compiling a folder's ignore
+    files overlaps other listings too. rules=None means not pruning. listed
+    is the folder's checkpointed (mtime_ns, entries), its entries used instead
+    of listing it again as long as the folder's mtime hasn't moved.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if listed is not None and mtime is not None and listed[0] == mtime:
+        entries = [(name, os.path.join(path, name), is_dir, is_link, None)
+                   for name, is_dir, is_link in listed[1]]
+    else:
+        entries = list_entries(path, stats)
+    if rules is not None:
+        rules = search_ignore.extend(rules, path, rel_root, [e[0] for e in entries])
+    return entries, rules, mtime
+
+
+def walk_tree(scope, threads=WALK_THREADS, cancel=None, roots=('',), leftover=None,
+              ignore=False, stats=False, listings=None):
+    """Yield (rel, full, is_dir, stat) for every kept entry under scope, breadth-first.
+
+    Each folder is handed to a thread pool the moment its parent's listing
+    turns it up, so on latency-bound volumes (external SSDs, CloudStorage) many
+    listings are in flight at once. Results are consumed strictly in the order
+    folders were discovered, each folder in name order, so the output is the
+    same for any thread count. Closing the generator — or setting the cancel
+    event, checked after each folder — cancels queued listings.
+
+    roots are the folders to start from, relative to scope and ending in a
+    separator ('' is the scope itself). At least one folder is always walked;
+    when the cancel event then stops the walk, the folders not yet walked are
+    appended to leftover in the same form, so passing them back as roots later
+    continues the walk exactly where it stopped.
+
+    With ignore, whatever .gitignore/.feralignore files exclude (search_ignore)
+    is skipped, and excluded folders are never listed at all. stat is the
+    entry's stat result with stats, else None.
+
+    listings (a search_resume walk checkpoint, without stats) maps folders to
+    their (mtime_ns, entries): those folders aren't listed again unless their
+    mtime has moved, and every folder listed is added to it (or replaced).
+
+    roots are handed to the pool a few at a time as the walk reaches them, so
+    a long list (a resumed walk's frontier) costs nothing up front; the ignore
+    rules above them are loaded as they go, each ignore file read once.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    loader = search_ignore.Loader(scope) if ignore else None
+
+    def parent_rules(rel_root):
+        if loader is None:
+            return None
+        if not rel_root:
+            return search_ignore.EMPTY
+        parent = rel_root[:-1].rpartition(os.sep)[0]
+        return loader.load(parent + os.sep if parent else '')
+
+    def submit(path, rel_root, rules):
+        # A checkpointed folder still costs a stat, so it goes to the pool too.
+        listed = listings.get(rel_root) if listings is not None else None
+        return pool.submit(list_folder, path, rel_root, rules, stats, listed), rel_root
+
+    pool = ThreadPoolExecutor(max_workers=max(1, threads))
+    roots = iter(roots)
+    ahead = deque()    # roots handed to the pool, in order
+    pending = deque()  # folders found by the walk, after every root
+    window = max(1, threads) * 2
+
+    def top_up():
+        while len(ahead) < window:
+            rel_root = next(roots, None)
+            if rel_root is None:
+                return
+            path = os.path.join(scope, rel_root) if rel_root else scope
+            ahead.append(submit(path, rel_root, parent_rules(rel_root)))
+
+    try:
+        top_up()
+        while ahead or pending:
+            future, rel_root = (ahead or pending).popleft()
+            top_up()
+            entries, rules, mtime = future.result()
+            if listings is not None and mtime is not None:
+                listed = listings.get(rel_root)
+                if listed is None or listed[0] != mtime:
+                    listings[rel_root] = (mtime, tuple((e[0], e[2], e[3]) for e in entries))
+            for name, full, is_dir, is_link, st in entries:
+                if not keep_entry(name, is_dir):
+                    continue
+                rel = rel_root + name
+                if rules is not None and rules.ignored(rel, is_dir):
+                    continue
+                if is_dir and not is_link:
+                    pending.append(submit(full, rel + os.sep, rules))
+                yield rel, full, is_dir, st
+            if (ahead or pending) and cancel is not None and cancel.is_set():
+                if leftover is not None:
+                    leftover.extend(rel_root for _future, rel_root in ahead)
+                    leftover.extend(roots)
+                    leftover.extend(rel_root for _future, rel_root in pending)
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def archive_matches(archives, rel, full, st, want_files, want_dirs, query, matches):
+    """Yield (member string, is_dir) for each path inside the archive at full
+    that passes the query. Filters needing a stat get the archive's."""
+    if query.needs_stat and st is None:
+        try:
+            st = os.stat(full)
+        except OSError:
+            return
+    for inner in archives.members(full, st):
+        is_dir = inner.endswith('/')
+        if not (want_dirs if is_dir else want_files):
+            continue
+        inner = inner.rstrip('/')
+        inner_rel = search_archive.join(rel, inner)
+        if query.accepts(inner_rel, is_dir, full, st) and matches(inner_rel.lower()):
+            yield search_archive.join(full, inner), is_dir
+
+
+@engine('walk', depth_ordered=True)
+def search_walk(scope, terms, want_files, want_dirs, opts):
+    """Yield matches breadth-first, so shallower paths always come out first.
+
+    Same pruning and matching as os.walk-based walking (symlinked folders are
+    listed but not entered), but level by level and in name order, which lets
+    main() stop the walk as soon as TopK says deeper matches can't rank.
+
+    Resumable: at opts.deadline the walk stops between folders and leaves the
+    folders it didn't get to in status['cursor']; opts.resume starts from them.
+    Honours ignore files unless opts.ignore is off. Query filters run on each
+    entry before any term matching, with the stat the listing already took.
+
+    Folders listed by a walk that was cut short (deadline, SIGTERM) are
+    checkpointed for the next walk of the scope, whatever its query
+    (search_resume.load_listings), with their mtimes: a folder that has
+    changed since is listed again. Filters that need stats walk without it.
+
+    With opts.archives, the paths inside each zip archive passed are matched
+    too (search_archive), right after the archive; modified:/size: filters
+    test the archive. Members come out deeper than what follows them, so
+    this walk isn't shallowest-first any more — main() doesn't stop it early.
+    """
+    matches = name_matcher(terms, opts)
+    query = opts.query
+    timer = None
+    if opts.deadline is not None:
+        timer = threading.Timer(max(0.0, opts.deadline - time.monotonic()), opts.cancel.set)
+        timer.daemon = True
+        timer.start()
+    leftover = []
+    checkpoint = None
+    listings = None
+    if not query.needs_stat:
+        checkpoint = search_resume.load_listings(scope)
+        listings = checkpoint['listings'] if checkpoint else {}
+    known = dict(listings or ())
+    archives = search_archive.ArchiveListings(scope) if opts.archives else None
+    try:
+        for rel, full, is_dir, st in walk_tree(scope, cancel=opts.cancel, roots=opts.resume or ('',),
+                                               leftover=leftover, ignore=opts.ignore,
+                                               stats=query.needs_stat, listings=listings):
+            if archives is not None and not is_dir and search_archive.is_archive(rel):
+                yield from archive_matches(archives, rel, full, st, want_files, want_dirs, query, matches)
+            if not (want_dirs if is_dir else want_files):
+                continue
+            if not query.accepts(rel, is_dir, full, st):
+                continue
+            if matches(rel.lower()):
+                yield full, is_dir
+    finally:
+        if timer is not None:
+            timer.cancel()
+        # Once a walk has been cut short (or is already working from a
+        # checkpoint), its listings are worth keeping for the next one.
+        if listings is not None and listings != known and (checkpoint or opts.cancel.is_set()):
+            search_resume.save_listings(scope, listings, checkpoint and checkpoint['created'])
+        if archives is not None:
+            archives.save()
+    if leftover:
+        opts.status['truncated'] = True
+        opts.status['cursor'] = leftover
+
+
+@engine('index')
+def search_index_engine(scope, terms, want_files, want_dirs, opts):
+    # Refresh the scope's index (re-listing only folders whose mtime moved),
+    # persist it if anything changed, then match against it exactly as the
+    # walk engine matches against the live tree. With trigrams, only entries
+    # whose paths hold every trigram of the (3+ char) terms are checked at all.
+    # Ignore files prune the index as they do the walk, unless opts.ignore is off.
+    matches = name_matcher(terms, opts)
+    index = search_index.load_index(scope)
+    rules = {} if opts.ignore else None
+    if search_index.refresh_index(scope, index, keep_entry, rules):
+        search_index.save_index(scope, index)
+    candidates = search_index.iter_entries(index)
+    if opts.trigrams:
+        entries = list(candidates)
+        postings = search_index.load_trigrams(scope, index, entries)
+        ids = search_index.trigram_candidates(postings, [] if opts.fuzzy else terms)
+        candidates = entries if ids is None else (entries[i] for i in ids)
+    query = opts.query
+    for rel, is_dir in candidates:
+        if not (want_dirs if is_dir else want_files):
+            continue
+        if rules is not None and search_index.ignored(rules, rel, is_dir):
+            continue
+        if not query.accepts(rel, is_dir, os.path.join(scope, rel) if query.needs_stat else None):
+            continue
+        if matches(rel.lower()):
+            yield os.path.join(scope, rel), is_dir
+
+
+def mdfind_stream(scope, expr, read_cap, attr, deadline=None, cancel=None):
+    """Yield (path, attr value) from a streaming mdfind, bounded to read_cap lines.
 
     Streaming + a read cap keeps latency bounded even when a term matches
     hundreds of thousands of files (mdfind can't exclude node_modules itself).
+    The attribute comes back on the same line (`-attr`), so nothing has to be
+    looked up per path afterwards; its value is None when mdfind has none.
+    At deadline (a time.monotonic() value), or as soon as the cancel event is
+    set, mdfind is killed, which ends the stream even while its reader is
+    blocked waiting on a slow volume.
     """
     try:
         proc = subprocess.Popen(
-            ['mdfind', '-onlyin', scope, expr],
+            [MDFIND, '-onlyin', scope, '-attr', attr, expr],
             stdout=subprocess.PIPE, text=True
         )
     except OSError:
         return
+    done = threading.Event()
+
+    def watch():
+        # A blocked readline can't check anything itself; this thread does.
+        while not done.wait(MDFIND_WATCH_INTERVAL):
+            if (cancel is not None and cancel.is_set()) or (
+                    deadline is not None and time.monotonic() >= deadline):
+                proc.kill()
+                return
+
+    if deadline is not None or cancel is not None:
+        threading.Thread(target=watch, daemon=True).start()
+    sep = f'   {attr} = '
     try:
         for read, line in enumerate(proc.stdout, start=1):
-            full = line.rstrip('\n')
+            full, found, value = line.rstrip('\n').rpartition(sep)
+            if not found:
+                full, value = value, None
+            elif value == '(null)':
+                value = None
             if full:
-                yield full
+                yield full, value
             if read >= read_cap:
                 break
     finally:
+        done.set()
         proc.kill()
         try:
             proc.stdout.close()
@@ -101,45 +621,295 @@ def mdfind_stream(scope, expr, read_cap):
             pass
 
 
-def search_spotlight(scope, terms, want_files, want_dirs):
+@engine('locate')
+def search_locate_engine(scope, terms, want_files, want_dirs, opts):
+    # Match against the scope's locate-style database (search_locate.py),
+    # building it on first use. Queries never touch the tree, so results are
+    # only as fresh as the last `search_locate.py <scope>` run. The database
+    # holds everything, so junk is pruned here, as with Spotlight. A database
+    # that turns out corrupt (even partway through) is rebuilt once, and the
+    # read carries on past the last entry checked — entries are sorted. If
+    # that fails too, status['truncated'] says the results aren't complete.
+    import search_locate
+    matches = name_matcher(terms, opts)
+    db_path = search_locate.default_db(scope)
+    query = opts.query
+    done = None
+    for rebuild in (not os.path.exists(db_path), True):
+        try:
+            if rebuild:
+                search_locate.build_db(scope, db_path)
+            _db_scope, entries = search_locate.read_db(db_path)
+            for rel, is_dir in entries:
+                if done is not None and rel <= done:
+                    continue
+                done = rel
+                if not (want_dirs if is_dir else want_files):
+                    continue
+                if is_skipped(rel.split(os.sep)):
+                    continue
+                if not query.accepts(rel, is_dir, os.path.join(scope, rel) if query.needs_stat else None):
+                    continue
+                if matches(rel.lower()):
+                    yield os.path.join(scope, rel), is_dir
+        except (OSError, ValueError):
+            continue
+        return
+    opts.status['truncated'] = True
+
+
+@engine('spotlight', verified=False)
+def search_spotlight(scope, terms, want_files, want_dirs, opts):
     # Query mdfind on just the most-selective (longest) term, then post-filter
     # so ALL terms appear in the relative path — same semantics as the walk
     # engine, so folder+file queries like "feral header" work. Querying one
     # narrow term (rather than ANDing them all in the filename) also keeps the
     # stream small. Junk is dropped inline; caps bound how much we read/keep.
-    READ_CAP = 20000
-    KEEP_CAP = 500
-    selective = max(terms, key=len)
-    clauses = ['kMDItemFSName == "*%s*"c' % selective.replace('"', '')]
+    # Fuzzy mode asks for names holding the term's letters in order (*f*h*d*)
+    # and leaves the real matching and scoring to rank_fuzzy(). If a cap cuts
+    # the stream short, status['truncated'] is set (results aren't complete).
+    # Nothing is statted here: folder-ness comes from the content type mdfind
+    # streams alongside each path, and existence is checked on the final
+    # results only — two stats per candidate add up on CloudStorage paths.
+    # mdfind can't pick up where it stopped, so at opts.deadline the matches
+    # so far are handed over with the cursor [''] (the whole scope): the rerun
+    # starts again from the top, with no deadline, and reads to the caps.
+    # Under a hard deadline that rerun couldn't finish either, so there's none.
+    status = opts.status
+    deadline = opts.deadline if opts.hard_deadline or not opts.resume else None
+    matches = name_matcher(terms, opts)
+    selective = max(terms, key=len).replace('"', '') if terms else ''  # '' (filters only): every name
+    if opts.fuzzy:
+        clauses = ['kMDItemFSName == "*%s*"c' % '*'.join(selective)]
+    else:
+        clauses = ['kMDItemFSName == "*%s*"c' % selective]
     if want_dirs and not want_files:
         clauses.append('kMDItemContentType == "public.folder"')
     elif want_files and not want_dirs:
         clauses.append('kMDItemContentType != "public.folder"')
     expr = ' && '.join(clauses)
 
-    out = []
-    for full in mdfind_stream(scope, expr, READ_CAP):
+    kept = 0
+    read = 0
+    for full, content_type in mdfind_stream(scope, expr, SPOTLIGHT_READ_CAP, 'kMDItemContentType',
+                                            deadline, opts.cancel):
+        if opts.cancel.is_set():
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        read += 1
+        if read >= SPOTLIGHT_READ_CAP:
+            status['truncated'] = True
         rel = os.path.relpath(full, scope)
         parts = rel.split(os.sep)
         if is_skipped(parts):
             continue
-        if not all(t in rel.lower() for t in terms):
+        if not matches(rel.lower()):
             continue
-        if not os.path.exists(full):
+        is_dir = None if content_type is None else content_type in FOLDER_TYPES
+        if not opts.query.accepts(rel, is_dir, full):
             continue
-        out.append((full, os.path.isdir(full)))
-        if len(out) >= KEEP_CAP:
+        yield full, is_dir
+        kept += 1
+        if kept >= SPOTLIGHT_KEEP_CAP:
+            status['truncated'] = True
+            return
+    if deadline is not None and time.monotonic() >= deadline:
+        status['truncated'] = True
+        if not opts.hard_deadline:
+            status['cursor'] = ['']
+
+
+@engine('hybrid', verified=False)
+def search_hybrid(scope, terms, want_files, want_dirs, opts):
+    """Race Spotlight and the walker; yield both streams until the budget runs out.
+
+    Spotlight answers fast but misses whatever it hasn't indexed; the walker
+    finds everything but takes O(tree) time. Both run in their own thread and
+    feed one queue, and matches are passed on as they arrive (TopK dedupes the
+    overlap). At opts.deadline whatever hasn't arrived is dropped and
+    both engines are cancelled. Results only count as complete if the walker
+    finished — Spotlight's are a subset of its.
+    """
+    results = queue.Queue()
+    finished = {}
+
+    def produce(name, search_fn, sub_opts):
+        matches = search_fn(scope, terms, want_files, want_dirs, sub_opts)
+        try:
+            for match in matches:
+                if opts.cancel.is_set():
+                    return
+                results.put(match)
+            finished[name] = True
+        finally:
+            matches.close()
+            results.put(name)
+
+    producers = {'spotlight': search_spotlight, 'walk': search_walk}
+    for name, search_fn in producers.items():
+        threading.Thread(target=produce, args=(name, search_fn, opts.child()), daemon=True).start()
+
+    running = len(producers)
+    try:
+        while running:
+            remaining = None
+            if opts.deadline is not None:
+                remaining = opts.deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+            try:
+                item = results.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if isinstance(item, str):
+                running -= 1
+            else:
+                yield item
+    finally:
+        opts.cancel.set()
+    if not finished.get('walk'):
+        opts.status['truncated'] = True
+
+
+def verify_results(results, threads=WALK_THREADS):
+    """Drop results that no longer exist and fill in unknown is_dir values.
+
+    One stat per result, run in parallel — on CloudStorage each can take a
+    network round trip. Order is kept.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def check(result):
+        full, is_dir = result
+        try:
+            st = os.stat(search_archive.split(full)[0])
+        except OSError:
+            return None
+        return full, stat.S_ISDIR(st.st_mode) if is_dir is None else is_dir
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        return [r for r in pool.map(check, results) if r is not None]
+
+
+def search_contents(scope, terms, opts, icons=None):
+    """Items for `--types content`: files whose contents hold every term.
+
+    Files come from the walk (ignore files honoured, query filters applied
+    before anything is read), shallowest first, and
+    are read by search_content's process pool. The walk stops at the first
+    MAX_RESULTS matches, which are ranked like name matches and shown with the
+    matched line as their subtitle.
+    """
+    import search_content
+    query = opts.query
+    excluded = search_match.compile((), query.negated)
+    files = (
+        full for rel, full, is_dir, st in walk_tree(scope, ignore=opts.ignore, stats=query.needs_stat)
+        if not is_dir and query.accepts(rel, is_dir, full, st) and excluded(rel.lower())
+    )
+    matches = search_content.search(files, terms)
+    top = TopK(MAX_RESULTS, terms, search_frecency.boosts(scope))
+    lines = {}
+    try:
+        for full, line_no, text in matches:
+            lines[full] = (line_no, text)
+            top.push(full, False)
+            if len(lines) >= MAX_RESULTS:
+                break
+    finally:
+        matches.close()
+        files.close()
+    items = []
+    for full, _is_dir in top.results():
+        item = make_item(full, scope, False, icons)
+        line_no, text = lines[full]
+        item["subtitle"] = f"{item['subtitle']}:{line_no}  {text}"
+        items.append(item)
+    return items
+
+
+def relative(full, scope):
+    """full relative to scope; cheap slicing for the usual case of a child path."""
+    prefix = os.path.join(scope, '')
+    if full.startswith(prefix):
+        return full[len(prefix):]
+    return os.path.relpath(full, scope)
+
+
+def rank_fuzzy(top, scope, terms, matches, hits=None):
+    """Fuzzy-match and score candidates in batches, pushing matches into top.
+
+    Matches are also appended to hits (up to the prefix cache's limit).
+    """
+    matches = iter(matches)
+    while True:
+        batch = list(islice(matches, FUZZY_BATCH))
+        if not batch:
             break
-    return out
+        rels = [relative(full, scope) for full, _ in batch]
+        for i, score in search_fuzzy.score_batch(terms, rels):
+            full, is_dir = batch[i]
+            top.push(full, is_dir, key=fuzzy_rank_key(full, score))
+            if hits is not None and len(hits) <= search_cache.MAX_CANDIDATES:
+                hits.append((full, is_dir))
+
+
+def query_daemon(scope, terms, want_files, want_dirs, match='substring'):
+    """Ask search-daemon.py for ranked matches.
+
+    Returns None when the daemon isn't running, doesn't watch this scope, or
+    misbehaves in any way — the caller then falls back to its own engine.
+    """
+    request = {
+        "scope": scope,
+        "terms": terms,
+        "files": want_files,
+        "dirs": want_dirs,
+        "match": match,
+        "limit": MAX_RESULTS,
+    }
+    import socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(DAEMON_TIMEOUT)
+            sock.connect(DAEMON_SOCKET)
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            chunks = []
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                chunks.append(data)
+        reply = json.loads(b''.join(chunks))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(reply, dict) or not reply.get('ok'):
+        return None
+    return [(full, bool(is_dir)) for full, is_dir in reply.get('matches', [])]
 
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument('--engine', choices=['walk', 'spotlight'], default='walk')
-    ap.add_argument('--types', choices=['files', 'dirs', 'all'], default='files')
+    ap.add_argument('--engine', choices=sorted(ENGINES), default='walk')
+    ap.add_argument('--types', choices=['files', 'dirs', 'all', 'content'], default='files')
+    ap.add_argument('--match', choices=['substring', 'fuzzy'], default='substring')
+    ap.add_argument('--budget', type=int, default=int(BUDGET * 1000),
+                    help='ms to search before answering with the results so far (0: no limit)')
+    ap.add_argument('--hard-budget', action='store_true',
+                    help='the caller stops waiting at the budget: spotlight doesn\'t ask for a rerun')
+    ap.add_argument('--no-ignore', action='store_true',
+                    help='walk and index engines: don\'t skip what .gitignore/.feralignore files exclude')
+    ap.add_argument('--trigrams', action='store_true',
+                    help='index engine: narrow candidates with a trigram index')
+    ap.add_argument('--archives', action='store_true',
+                    help='walk engine: also match the paths inside .zip/.alfredworkflow archives')
     ap.add_argument('scope')
     ap.add_argument('query', nargs='?', default='')
     args = ap.parse_args()
+    if args.types == 'content' and args.match == 'fuzzy':
+        ap.error('--types content only matches substrings')
+    started = time.monotonic()
 
     scope = os.path.expanduser(args.scope)
     query = args.query.strip()
@@ -151,7 +921,17 @@ def main():
     if not query:
         # No query typed: offer the scope itself so Return just opens the folder.
         # open_folder tells the downstream action to open rather than reveal —
-        # revealing a folder would select it in its parent instead.
+        # revealing a folder would select it in its parent instead. Below it,
+        # what's been opened most from here lately, straight from the
+        # frecency store: nothing is walked.
+        want_dirs = args.types in ('dirs', 'all')
+        want_files = args.types != 'dirs'
+        icons = search_icons.IconCache()
+        recent = [
+            make_item(full, scope, is_dir, icons)
+            for full, is_dir in search_frecency.ranked(scope, MAX_RESULTS)
+            if (want_dirs if is_dir else want_files)
+        ]
         emit([{
             "title": f"Open {os.path.basename(scope.rstrip('/'))}",
             "subtitle": f"{scope} — or type to search",
@@ -159,36 +939,154 @@ def main():
             "type": "file",
             "icon": {"type": "fileicon", "path": scope},
             "variables": {"open_folder": "1"},
-        }])
+        }] + recent)
+        icons.flush()
+        return
+
+    # Terms plus ext:/in:/modified:/size:/-term filters (search_query.py).
+    try:
+        parsed = search_query.Query(query)
+    except ValueError as e:
+        emit([{"title": "Invalid filter", "subtitle": str(e), "valid": False}])
+        return
+    terms = parsed.terms
+
+    # Content search reads files rather than matching names, so none of the
+    # name machinery below (daemon, prefix cache, engines) applies.
+    if args.types == 'content':
+        if not terms:
+            emit([{"title": "Type a word to search contents", "subtitle": f"Filters narrow which files in {os.path.basename(scope)} are read; a word is still needed", "valid": False}])
+            return
+        icons = search_icons.IconCache()
+        items = search_contents(scope, terms, EngineOptions(ignore=not args.no_ignore, query=parsed), icons)
+        if not items:
+            emit([{"title": "No matches", "subtitle": f"No file in {os.path.basename(scope)} contains “{query}”", "valid": False}])
+            return
+        emit(items)
+        icons.flush()
         return
 
-    terms = [t.lower() for t in query.split() if t]
     want_files = args.types in ('files', 'all')
     want_dirs = args.types in ('dirs', 'all')
 
-    if args.engine == 'spotlight':
-        matches = search_spotlight(scope, terms, want_files, want_dirs)
-    else:
-        matches = search_walk(scope, terms, want_files, want_dirs)
+    # Fuzzy mode has the engines hand over every candidate (no terms to
+    # filter on) and does the matching itself, in batches.
+    fuzzy = args.match == 'fuzzy'
+    budget = args.budget / 1000.0
+    opts = EngineOptions(fuzzy=fuzzy, trigrams=args.trigrams, ignore=not args.no_ignore,
+                         query=parsed, deadline=started + budget if budget else None,
+                         archives=args.archives, hard_deadline=args.hard_budget)
+    mode = (args.engine, args.types, args.match, args.no_ignore, parsed.key(), args.archives)
 
-    # Dedupe, then rank.
-    seen = set()
-    unique = []
-    for full, is_dir in matches:
-        if full in seen:
-            continue
-        seen.add(full)
-        unique.append((full, is_dir))
+    # Alfred's "terminate previous script" queue mode SIGTERMs this run as
+    # soon as the next key arrives. Cancel the engines and unwind, so the walk
+    # checkpoints the folders it listed on its way out, rather than just dying.
+    def on_sigterm(_signum, _frame):
+        opts.cancel.set()
+        raise Terminated()
+    signal.signal(signal.SIGTERM, on_sigterm)
 
-    unique.sort(key=lambda pair: rank_key(pair[0], terms))
-    items = [make_item(full, scope, is_dir) for full, is_dir in unique[:MAX_RESULTS]]
+    # A running search-daemon.py answers first. Failing that, a candidate list
+    # cached by an earlier query this one narrows ("fe" -> "fer") is filtered
+    # instead of searching again; failing that, the engine runs. Only
+    # depth-ordered engines (walk) can be cut short, and only when ranking by
+    # rank_key. `complete` says whether `matches` will be every match, i.e.
+    # worth caching. A walk that ran out of budget last time for this same
+    # query resumes from its cursor (search_resume.py), seeded with what it
+    # had found so far.
+    depth_ordered = False
+    verified = True
+    complete = False
+    cached = None
+    resumed = None
+    # The daemon only knows terms and names on disk, and always honours
+    # ignore files, so filtered, archive and --no-ignore queries skip it.
+    matches = None
+    if not parsed.has_filters and not args.archives and not args.no_ignore:
+        matches = query_daemon(scope, terms, want_files, want_dirs, args.match)
+    if matches is None:
+        complete = True
+        verified = ENGINES[args.engine][2]
+        cached = search_cache.lookup(scope, mode, terms, fuzzy)
+        if cached is not None:
+            matches = cached[1]
+            if not fuzzy:
+                narrowed = search_match.compile(terms)
+                matches = [
+                    (full, is_dir) for full, is_dir in matches
+                    if narrowed(relative(full, scope).lower())
+                ]
+        else:
+            search_fn, depth_ordered, _verified = ENGINES[args.engine]
+            depth_ordered = depth_ordered and not fuzzy and not args.archives
+            resumed = search_resume.load(scope, mode, terms)
+            if resumed is not None:
+                opts.resume = resumed['roots']
+            matches = search_fn(scope, terms, want_files, want_dirs, opts)
+
+    # Dedupe + rank as matches stream in, keeping only the best MAX_RESULTS
+    # (and, for the prefix cache, up to MAX_CANDIDATES of the matches).
+    top = TopK(MAX_RESULTS, terms, search_frecency.boosts(scope))
+    hits = []
+    # A cursor of [''] (spotlight, or a walk that listed nothing) starts over,
+    # so there is nothing of the last run's to seed.
+    if resumed is not None and resumed['roots'] != ['']:
+        if fuzzy:
+            rank_fuzzy(top, scope, terms, resumed['top'])
+        else:
+            for full, is_dir in resumed['top']:
+                top.push(full, is_dir)
+        hits.extend(resumed['hits'])
+    try:
+        if fuzzy:
+            rank_fuzzy(top, scope, terms, matches, hits)
+        else:
+            for full, is_dir in matches:
+                if len(hits) <= search_cache.MAX_CANDIDATES:
+                    hits.append((full, is_dir))
+                if not top.push(full, is_dir) and depth_ordered:
+                    complete = False
+                    break
+    finally:
+        # Close the engine here, SIGTERM or not: a Terminated raised in this
+        # frame would otherwise keep it alive past os._exit, and the walk's
+        # checkpoint with it.
+        if hasattr(matches, 'close'):
+            matches.close()
+    if complete and not opts.status.get('truncated'):
+        if cached is not None and cached[0] == terms:
+            search_cache.store(scope, mode, terms, None, used_terms=terms)
+        else:
+            search_cache.store(scope, mode, terms, hits, cached[0] if cached else None)
+    rerun = None
+    cursor = opts.status.get('cursor')
+    if cursor:
+        search_resume.save(scope, mode, terms, cursor, top.results(), hits)
+        rerun = RERUN_INTERVAL
+    elif resumed is not None:
+        search_resume.clear(scope)
+    results = top.results()
+    if not verified:
+        results = verify_results(results)
+    icons = search_icons.IconCache()
+    items = [make_item(full, scope, is_dir, icons) for full, is_dir in results]
 
     if not items:
+        if rerun:
+            emit([{"title": "Searching…", "subtitle": f"Nothing matching “{query}” yet in {os.path.basename(scope)}", "valid": False}], rerun)
+            return
         emit([{"title": "No matches", "subtitle": f"Nothing matching “{query}” in {os.path.basename(scope)}", "valid": False}])
         return
 
-    emit(items)
+    emit(items, rerun)
+    # Icons that weren't ready are made in the background, once Alfred has
+    # the results.
+    icons.flush()
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except Terminated:
+        # Nobody is reading the output now; don't wait on listings in flight.
+        os._exit(128 + signal.SIGTERM)
@@ -0,0 +1,87 @@
+"""
+The member names of zip archives, for search.py's `--archives`.
+
+.zip and .alfredworkflow files (the latter are plain zips) are opaque to a
+name search: the walk sees the archive, not what's in it. With --archives,
+the walk engine also matches the paths inside every archive it passes.
+
+Names come from the archive's central directory — the index at the end of
+every zip — so nothing is decompressed, and a listing costs a seek and one
+read however big the archive. Listings are cached per scope (search_store's
+`.archives` file) keyed by the archive's (size, mtime), so each archive is
+read once until it changes. An archive that can't be read lists as empty.
+
+A member is handed around as one string, the archive's path and the member's
+joined by MEMBER_SEP (a NUL, which no real path can contain), so the rest of
+search.py — ranking, dedupe, the prefix cache — treats it like any path.
+split() takes it apart again for display.
+"""
+
+import os
+
+import search_store
+
+ARCHIVE_EXTENSIONS = ('.zip', '.alfredworkflow')
+MEMBER_SEP = '\0'
+# Names kept per archive, and archives kept in a scope's cache.
+MAX_MEMBERS = 20000
+MAX_ARCHIVES = 5000
+
+
+def is_archive(name):
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def join(archive, member):
+    return archive + MEMBER_SEP + member
+
+
+def split(full):
+    """(archive path, member name) for a member string; (full, None) otherwise."""
+    archive, sep, member = full.partition(MEMBER_SEP)
+    return (archive, member) if sep else (full, None)
+
+
+def read_members(path):
+    """Member names from the archive's central directory; () if it can't be read."""
+    # Imported here: search.py uses split() on every run, and zipfile (with
+    # what it pulls in) would cost every keystroke a dozen ms for nothing.
+    import zipfile
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return tuple(zf.namelist()[:MAX_MEMBERS])
+    except (OSError, zipfile.BadZipFile, ValueError, EOFError):
+        return ()
+
+
+class ArchiveListings:
+    """A scope's cached archive listings, for one run."""
+
+    def __init__(self, scope):
+        self.path = search_store.scope_file(scope, 'archives')
+        cached = search_store.load(self.path, {})
+        self.cache = cached if isinstance(cached, dict) else {}
+        self.changed = False
+
+    def members(self, full, st=None):
+        """The member names of the archive at full; st is its stat, if known."""
+        try:
+            st = st or os.stat(full)
+        except OSError:
+            return ()
+        key = (st.st_size, st.st_mtime_ns)
+        hit = self.cache.get(full)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        names = read_members(full)
+        self.cache[full] = (key, names)
+        self.changed = True
+        return names
+
+    def save(self):
+        if not self.changed:
+            return
+        if len(self.cache) > MAX_ARCHIVES:
+            # Keep the most recently added (dicts keep insertion order).
+            self.cache = dict(list(self.cache.items())[-MAX_ARCHIVES:])
+        search_store.save(self.path, self.cache)
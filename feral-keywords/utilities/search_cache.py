@@ -0,0 +1,85 @@
+"""
+Keystroke-prefix result cache for search.py.
+
+Alfred reruns the script filter on every keystroke — "fe", "fer", "feral" — and
+each longer query can only match a subset of what the shorter one matched: if
+every old term is contained in some new term, anything the new query matches
+the old one matched too (for fuzzy matching, "contained" means "a
+subsequence of"). So each run that produced a *complete* candidate list
+records it here, and the next run filters the best recorded superset instead
+of walking the tree or calling mdfind again. Typing a word costs one scan.
+
+Entries are kept per scope (search_store's `.prefix` file), keyed by
+everything besides the query that shapes the candidate list (engine, types,
+match mode). Each expires TTL seconds after it was recorded — the tree may
+have changed since — and the file holds at most MAX_ENTRIES, evicting the
+least recently used. Candidate lists longer than MAX_CANDIDATES aren't recorded at all: they're
+what you get from one-letter queries, and loading them back would cost more
+than the scan they save.
+"""
+
+import time
+
+import search_store
+
+TTL = 60.0
+MAX_ENTRIES = 8
+MAX_CANDIDATES = 5000
+
+
+def is_subsequence(short, long):
+    it = iter(long)
+    return all(ch in it for ch in short)
+
+
+def narrows(old_terms, new_terms, fuzzy):
+    """True if every match of new_terms is guaranteed to match old_terms."""
+    contains = is_subsequence if fuzzy else (lambda a, b: a in b)
+    return all(any(contains(old, new) for new in new_terms) for old in old_terms)
+
+
+def _load(scope):
+    entries = search_store.load(search_store.scope_file(scope, 'prefix'))
+    return entries if isinstance(entries, list) else []
+
+
+def lookup(scope, mode, terms, fuzzy):
+    """(terms, candidates) of the smallest live entry the query narrows, or None.
+
+    mode is a hashable description of the engine settings; only entries
+    recorded with the same mode are considered.
+    """
+    now = time.time()
+    best = None
+    for created, _used, entry_mode, entry_terms, candidates in _load(scope):
+        if now - created > TTL or entry_mode != mode:
+            continue
+        if not narrows(entry_terms, terms, fuzzy):
+            continue
+        if best is None or len(candidates) < len(best[1]):
+            best = (entry_terms, candidates)
+    return best
+
+
+def store(scope, mode, terms, candidates, used_terms=None):
+    """Record a complete candidate list and mark the entry it came from as used.
+
+    candidates=None only marks used_terms' entry as used (a repeat query that
+    was answered straight from it). Expired entries are dropped, then the least
+    recently used ones beyond MAX_ENTRIES. An entry's TTL always runs from when
+    it was recorded — using it doesn't make its contents any fresher.
+    """
+    now = time.time()
+    kept = []
+    for created, used, entry_mode, entry_terms, entry_candidates in _load(scope):
+        if now - created > TTL:
+            continue
+        if candidates is not None and entry_mode == mode and entry_terms == terms:
+            continue
+        if entry_mode == mode and entry_terms == used_terms:
+            used = now
+        kept.append((created, used, entry_mode, entry_terms, entry_candidates))
+    if candidates is not None and len(candidates) <= MAX_CANDIDATES:
+        kept.append((now, now, mode, list(terms), list(candidates)))
+    kept.sort(key=lambda e: e[1])
+    search_store.save(search_store.scope_file(scope, 'prefix'), kept[-MAX_ENTRIES:])
@@ -0,0 +1,118 @@
+"""
+Full-text search for search.py's `--types content`.
+
+A file matches when its contents hold every query term (case-insensitively,
+ASCII case folding). Files are memory-mapped rather than read, so the regex
+searches run straight over the page cache without copying the file into
+Python, and only the first MAX_BYTES of each are searched. Binaries are
+skipped by sniffing: a NUL byte in the first SNIFF_BYTES means binary, the
+same test grep and git use.
+
+Reading is the expensive part, so files are handed out in batches to a pool
+of worker processes (regex matching holds the GIL; threads wouldn't scale).
+Only a few batches are in flight at once and results come back in submission
+order, so the caller sees matches in the order it supplied paths and can stop
+as soon as it has enough — whatever is still queued is cancelled.
+
+For each match the worker also returns the line the first term was found on,
+trimmed to SNIPPET_WIDTH characters around the match, for display.
+"""
+
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+
+MAX_BYTES = 4 * 1024 * 1024
+SNIFF_BYTES = 8192
+SNIPPET_WIDTH = 80
+# Paths per task, and tasks in flight per worker.
+BATCH = 32
+PREFETCH = 2
+WORKERS = min(4, os.cpu_count() or 1)
+
+
+@lru_cache(maxsize=8)
+def term_patterns(terms):
+    """Compiled case-insensitive byte patterns for a tuple of terms."""
+    return [re.compile(re.escape(t.encode('utf-8')), re.IGNORECASE) for t in terms]
+
+
+def snippet(mm, pos, end):
+    """(line number, text) of the line holding byte pos, centred on pos if long."""
+    start = mm.rfind(b'\n', 0, pos) + 1
+    stop = mm.find(b'\n', pos, end)
+    if stop < 0:
+        stop = end
+    line_no = mm[:start].count(b'\n') + 1
+    left = max(start, pos - SNIPPET_WIDTH // 2)
+    right = min(stop, left + SNIPPET_WIDTH)
+    text = mm[left:right].decode('utf-8', errors='replace')
+    text = ' '.join(text.split())
+    if left > start:
+        text = '…' + text
+    if right < stop:
+        text += '…'
+    return line_no, text
+
+
+def scan_file(path, terms):
+    """(line number, snippet) if path's contents hold every term, else None.
+    With no terms every text file matches, at its first line."""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if b'\0' in mm[:SNIFF_BYTES]:
+                    return None
+                end = min(size, MAX_BYTES)
+                first = None
+                for pattern in term_patterns(terms):
+                    m = pattern.search(mm, 0, end)
+                    if m is None:
+                        return None
+                    if first is None:
+                        first = m.start()
+                return snippet(mm, first or 0, end)
+    except (OSError, ValueError):
+        return None
+
+
+def scan_batch(paths, terms):
+    """[(path, line number, snippet)] for the paths in a batch that match."""
+    out = []
+    for path in paths:
+        found = scan_file(path, terms)
+        if found is not None:
+            out.append((path,) + found)
+    return out
+
+
+def search(paths, terms, workers=WORKERS):
+    """Yield (path, line number, snippet) for each of paths holding every term.
+
+    Matches come out in the order of paths. Closing the generator cancels the
+    batches not yet started.
+    """
+    terms = tuple(terms)
+    paths = iter(paths)
+    pool = ProcessPoolExecutor(max_workers=max(1, workers))
+    pending = deque()
+    try:
+        while True:
+            while len(pending) < workers * PREFETCH:
+                batch = list(islice(paths, BATCH))
+                if not batch:
+                    break
+                pending.append(pool.submit(scan_batch, batch, terms))
+            if not pending:
+                break
+            yield from pending.popleft().result()
+    finally:
+        # Waits only for the batches already running (at most one per worker).
+        pool.shutdown(cancel_futures=True)
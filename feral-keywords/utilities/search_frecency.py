@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+What gets opened from each search shortcut, for search.py's ranking and its
+empty-query list.
+
+Usage:
+    search_frecency.py "<scope>" "<path>"     record that path was opened
+
+The Reveal action behind every search shortcut runs this after opening a
+result (search.py hands each result's scope to it as $search_scope). Each
+scope keeps one small store (search_store's `.frecency` file): for every path
+opened, a score and when it was last bumped. Opening a path adds 1 to its
+score; scores halve every HALF_LIFE seconds, so a file opened daily this week
+outranks one opened a dozen times last spring. Only the MAX_ENTRIES highest
+scores are kept.
+
+search.py reads the store twice. With an empty query it lists the top
+entries straight from it — no walk, no stat, so it's instant even on a slow
+drive (a path deleted since is still listed until it decays out). With a
+query, rank_key() lifts each stored path by up to MAX_BOOST folder levels,
+by score: a favourite file three folders down ranks like one at the top.
+"""
+
+import math
+import os
+import sys
+import time
+
+import search_store
+
+HALF_LIFE = 14 * 86400.0
+MAX_ENTRIES = 200
+MAX_BOOST = 3
+
+
+def store_path(scope):
+    return search_store.scope_file(scope, 'frecency')
+
+
+def decayed(score, then, now):
+    return score * 0.5 ** (max(0.0, now - then) / HALF_LIFE)
+
+
+def load(scope):
+    """{full path: (score, last opened, is_dir)} for a scope."""
+    entries = search_store.load(store_path(scope), {})
+    return entries if isinstance(entries, dict) else {}
+
+
+def record(scope, full, is_dir, now=None):
+    """Count one opening of full."""
+    now = time.time() if now is None else now
+    entries = load(scope)
+    score, then, _is_dir = entries.get(full, (0.0, now, is_dir))
+    entries[full] = (decayed(score, then, now) + 1.0, now, is_dir)
+    if len(entries) > MAX_ENTRIES:
+        kept = sorted(entries.items(), key=lambda e: decayed(e[1][0], e[1][1], now), reverse=True)
+        entries = dict(kept[:MAX_ENTRIES])
+    search_store.save(store_path(scope), entries)
+
+
+def ranked(scope, limit, now=None):
+    """The top (full, is_dir) pairs, highest score first."""
+    now = time.time() if now is None else now
+    entries = load(scope)
+    best = sorted(entries.items(), key=lambda e: decayed(e[1][0], e[1][1], now), reverse=True)
+    return [(full, is_dir) for full, (_score, _then, is_dir) in best[:limit]]
+
+
+def boost(score):
+    """Folder levels a path with this score is lifted by in rank_key."""
+    return min(MAX_BOOST, int(math.log2(1.0 + score)))
+
+
+def boosts(scope, now=None):
+    """{full path: levels} for every stored path that earns a boost."""
+    now = time.time() if now is None else now
+    out = {}
+    for full, (score, then, _is_dir) in load(scope).items():
+        levels = boost(decayed(score, then, now))
+        if levels:
+            out[full] = levels
+    return out
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit('usage: search_frecency.py "<scope>" "<path>"')
+    scope, full = os.path.expanduser(sys.argv[1]), sys.argv[2]
+    if full and os.path.isdir(scope):
+        record(scope, full, os.path.isdir(full))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+fzf-style fuzzy matching and scoring for search.py's `--match fuzzy`.
+
+A term matches a path when its characters appear in order (a subsequence), so
+"fhd" finds "feral/header.txt". Every term must match (AND), exactly like the
+substring matcher.
+
+Filtering is done in batches with one regex pass: a batch of lowercased paths
+is joined into a newline-separated blob and a single compiled pattern walks it
+at C speed, yielding only the lines every term matches. Each term becomes
+`[^a\n]*a[^b\n]*b...` — every gap excludes the character that ends it, so the
+pattern can't backtrack and runs in linear time. Only the (usually few)
+surviving lines are scored in Python.
+
+Scoring follows fzf's v1 algorithm: find the leftmost subsequence end, walk
+back to the tightest start, then score that window — a base score per matched
+character, bonuses for matches at segment boundaries (after `/`, `-`, `_`,
+`.` or a space), camelCase humps and letter→digit steps, a run bonus for
+consecutive matches, and small penalties for gaps. The scoring loop works on
+indices into the existing strings and allocates nothing per character.
+"""
+
+import bisect
+import re
+from functools import lru_cache
+
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_DELIMITER = 9      # right after a path separator
+BONUS_BOUNDARY = 8       # right after - _ . or a space
+BONUS_CAMEL = 7          # lower→Upper or letter→digit
+BONUS_CONSECUTIVE = 4
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+BOUNDARY_CHARS = ' -_.'
+
+
+@lru_cache(maxsize=64)
+def line_regex(terms):
+    """One regex matching whole lines that contain every term as a subsequence.
+
+    terms must be a tuple of lowercased strings (it's the cache key).
+    """
+    lookaheads = []
+    for term in terms:
+        parts = []
+        for ch in term:
+            esc = re.escape(ch)  # re.escape output is valid inside [...] too
+            parts.append(f'[^{esc}\\n]*{esc}')
+        lookaheads.append('(?=' + ''.join(parts) + ')')
+    return re.compile('^' + ''.join(lookaheads) + '[^\\n]*', re.MULTILINE)
+
+
+def char_bonus(text, j):
+    """Bonus for matching text[j], from the character before it."""
+    if j == 0:
+        return BONUS_DELIMITER
+    prev = text[j - 1]
+    if prev == '/':
+        return BONUS_DELIMITER
+    if prev in BOUNDARY_CHARS:
+        return BONUS_BOUNDARY
+    cur = text[j]
+    if prev.islower() and cur.isupper():
+        return BONUS_CAMEL
+    if cur.isdigit() and not prev.isdigit():
+        return BONUS_CAMEL
+    return 0
+
+
+def score_term(term, low, orig):
+    """fzf v1 score of one lowercased term against low, or None if no match.
+
+    orig is the same text in its original case (for camelCase bonuses); pass
+    low again when the two differ in length.
+    """
+    pos = -1
+    for ch in term:
+        pos = low.find(ch, pos + 1)
+        if pos < 0:
+            return None
+    end = pos
+    pos = end + 1
+    for k in range(len(term) - 1, -1, -1):
+        pos = low.rfind(term[k], 0, pos)
+    start = pos
+
+    score = 0
+    ti = 0
+    tlen = len(term)
+    run = 0
+    run_bonus = 0
+    in_gap = False
+    for j in range(start, end + 1):
+        if ti < tlen and low[j] == term[ti]:
+            bonus = char_bonus(orig, j)
+            if run:
+                bonus = max(bonus, run_bonus, BONUS_CONSECUTIVE)
+            else:
+                run_bonus = bonus
+            if ti == 0:
+                score += SCORE_MATCH + bonus * BONUS_FIRST_CHAR_MULTIPLIER
+            else:
+                score += SCORE_MATCH + bonus
+            run += 1
+            ti += 1
+            in_gap = False
+        else:
+            score += SCORE_GAP_EXTENSION if in_gap else SCORE_GAP_START
+            in_gap = True
+            run = 0
+    return score
+
+
+def score(terms, text):
+    """Total score of every term against text, or None if any term misses."""
+    low = text.lower()
+    orig = text if len(text) == len(low) else low
+    total = 0
+    for term in terms:
+        s = score_term(term, low, orig)
+        if s is None:
+            return None
+        total += s
+    return total
+
+
+def score_batch(terms, texts):
+    """(index, score) for each of texts that every term matches.
+
+    One regex pass over the joined batch discards non-matches; only the
+    survivors are scored.
+    """
+    regex = line_regex(tuple(terms))
+    lowered = [t.lower() for t in texts]
+    starts = []
+    pos = 0
+    for line in lowered:
+        starts.append(pos)
+        pos += len(line) + 1
+    blob = '\n'.join(lowered)
+    out = []
+    for m in regex.finditer(blob):
+        i = bisect.bisect_left(starts, m.start())
+        if i >= len(starts) or starts[i] != m.start():
+            continue
+        low = lowered[i]
+        text = texts[i]
+        orig = text if len(text) == len(low) else low
+        total = 0
+        for term in terms:
+            total += score_term(term, low, orig)
+        out.append((i, total))
+    return out
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Ready-made icons for search results, so Alfred doesn't work one out per item.
+
+A `fileicon` icon makes Alfred ask macOS for the icon of that exact path, for
+every result on every keystroke — for images that means a QuickLook
+thumbnail each, which is what makes big Screenshots-style folders sluggish.
+Instead, IconCache.icon() answers from a folder of icons in the workflow
+cache (`icons/`), listed once per run:
+
+  - Images get a THUMB_SIZE PNG thumbnail, made with Pillow and named after
+    a hash of (path, mtime) — an edited image gets a new thumbnail.
+  - Other files share one icon per extension: the fileicon of an empty
+    placeholder file with that extension (`generic.pdf`), which macOS gives
+    the plain icon for the type. Alfred looks that up once, not per result.
+  - Folders share the icon of an empty placeholder folder. Packages (.app,
+    .key and the like — folders with an extension) keep their own icon.
+
+Whatever isn't ready yet gets `fileicon`, as before, and is handed to a
+background run of this script when the results are out (IconCache.flush()),
+so the next keystroke finds it. That run also marks the icons just used as
+recent and evicts the least recently used thumbnails past MAX_BYTES. An image
+Pillow can't read gets a `.none` marker so it isn't tried again, and shows its
+fileicon.
+
+Pillow is optional: without it, images keep `fileicon`. Only the background
+run imports it; a search only checks that it's there.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import search_store
+
+HAVE_PILLOW = importlib.util.find_spec('PIL') is not None
+
+THUMB_SIZE = 64
+MAX_BYTES = 64 * 1024 * 1024
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tif', '.tiff', '.webp', '.heic'}
+GENERIC = 'generic'
+FOLDER = 'generic-folder'
+
+
+def icon_dir():
+    path = os.path.join(search_store.cache_dir(), 'icons')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def thumb_name(full, mtime_ns):
+    return hashlib.sha1(f'{full}\0{mtime_ns}'.encode('utf-8', 'surrogatepass')).hexdigest()[:20]
+
+
+def placeholder_name(full, is_dir):
+    """The shared placeholder for a folder or a file's extension; None for
+    packages, which have icons of their own."""
+    ext = os.path.splitext(full.rstrip('/'))[1].lower()
+    if is_dir:
+        return None if ext else FOLDER
+    return GENERIC + ext
+
+
+class IconCache:
+    """Icons for one run's results, from what the icon folder held at start."""
+
+    def __init__(self):
+        self.folder = icon_dir()
+        try:
+            self.names = set(os.listdir(self.folder))
+        except OSError:
+            self.names = set()
+        self.wanted = []  # (kind, source path, icon file name) still to make
+        self.used = []    # thumbnails handed out, to mark as recent
+
+    def icon(self, full, is_dir):
+        """Alfred icon for a result, or its fileicon if nothing is ready yet."""
+        ext = os.path.splitext(full)[1].lower()
+        if not is_dir and ext in IMAGE_EXTENSIONS and HAVE_PILLOW:
+            try:
+                name = thumb_name(full, os.stat(full).st_mtime_ns)
+            except OSError:
+                name = None
+            if name is not None:
+                if name + '.png' in self.names:
+                    self.used.append(name + '.png')
+                    return {"path": os.path.join(self.folder, name + '.png')}
+                if name + '.none' not in self.names:
+                    self.wanted.append(('thumb', full, name))
+            return {"type": "fileicon", "path": full}
+        name = placeholder_name(full, is_dir)
+        if name is None:
+            return {"type": "fileicon", "path": full}
+        if name not in self.names:
+            self.wanted.append(('folder' if is_dir else 'file', full, name))
+            self.names.add(name)  # ask once per run
+            return {"type": "fileicon", "path": full}
+        return {"type": "fileicon", "path": os.path.join(self.folder, name)}
+
+    def flush(self):
+        """Start the background run for anything missing. Call after emitting."""
+        if not self.wanted:
+            return
+        try:
+            proc = subprocess.Popen([sys.executable, os.path.abspath(__file__)],
+                                    stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL, start_new_session=True)
+            proc.stdin.write(json.dumps({'make': self.wanted, 'used': self.used}).encode('utf-8'))
+            proc.stdin.close()
+        except OSError:
+            pass
+
+
+def make_thumbnail(source, dest):
+    """Write a THUMB_SIZE PNG of the image at source; False if it can't be read."""
+    from PIL import Image
+
+    tmp = dest + '.tmp%d' % os.getpid()
+    try:
+        with Image.open(source) as im:
+            im.thumbnail((THUMB_SIZE, THUMB_SIZE))
+            if im.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                im = im.convert('RGBA')
+            im.save(tmp, 'PNG')
+        os.replace(tmp, dest)
+        return True
+    except Exception:  # Pillow raises all sorts on odd files
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def evict(folder, max_bytes=MAX_BYTES):
+    """Delete the least recently used thumbnails until they fit in max_bytes."""
+    thumbs = []
+    total = 0
+    for entry in os.scandir(folder):
+        if entry.name.startswith(GENERIC) or not entry.is_file():
+            continue
+        st = entry.stat()
+        thumbs.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+    thumbs.sort()
+    for _mtime, size, path in thumbs:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def main():
+    request = json.load(sys.stdin)
+    folder = icon_dir()
+    for kind, source, name in request.get('make', []):
+        dest = os.path.join(folder, name)
+        if kind == 'folder':
+            os.makedirs(dest, exist_ok=True)
+        elif kind == 'file':
+            open(dest, 'a').close()
+        elif kind == 'thumb' and HAVE_PILLOW:
+            if not make_thumbnail(source, dest + '.png'):
+                open(dest + '.none', 'a').close()
+    for name in request.get('used', []):
+        try:
+            os.utime(os.path.join(folder, name))
+        except OSError:
+            pass
+    evict(folder)
+
+
+if __name__ == "__main__":
+    main()
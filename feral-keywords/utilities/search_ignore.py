@@ -0,0 +1,191 @@
+"""
+.gitignore-style pruning for search.py's walk and index engines (and the daemon).
+
+Dev folders are mostly things nobody searches for — dist/, build/, vendor/,
+.next/, virtualenvs — and walking them costs far more than the tree we care
+about. So the walker reads every `.gitignore` and `.feralignore` it comes
+across (from the scope down) and never enters what they exclude. A
+`.feralignore` uses the same syntax and wins over a `.gitignore` in the same
+folder; put one at the top of a scope to prune things git doesn't know about.
+
+Supported syntax is gitignore's: blank lines and `#` comments, `!` to
+re-include, a trailing `/` for folders only, a leading or inner `/` to anchor
+a pattern to its file's folder, `*`, `?`, `[...]` and `**`. Patterns in deeper
+files override shallower ones, and within a file the last match wins. As in
+git, nothing inside an excluded folder can be re-included (it's never read).
+Matching is case-insensitive on macOS, as git's core.ignorecase is there.
+
+Each ignore file is compiled once, when its folder is listed, into one regex
+with every pattern as an alternative in reverse order — the first alternative
+that matches is the file's last matching pattern. A folder without ignore
+files shares its parent's rules, so the per-entry cost is a regex match per
+ignore file above it, nothing more.
+"""
+
+import os
+import re
+import sys
+
+IGNORE_FILES = ('.gitignore', '.feralignore')
+FLAGS = re.IGNORECASE if sys.platform == 'darwin' else 0
+
+
+def translate(pattern):
+    """Regex source for one gitignore pattern, matched against a path relative
+    to the ignore file's folder. Returns None for patterns that match nothing."""
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    if not pattern:
+        return None
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            j = i
+            while j < n and pattern[j] == '*':
+                j += 1
+            at_segment = (i == 0 or pattern[i - 1] == '/') and (j == n or pattern[j] == '/')
+            if j - i >= 2 and at_segment:
+                if j == n:
+                    out.append('.*')            # trailing /** : everything inside
+                    i = j
+                else:
+                    out.append('(?:.*/)?')      # **/ : zero or more folders
+                    i = j + 1
+                continue
+            out.append('[^/]*')
+            i = j
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            j = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', '^') else i + 1)
+            if j < 0:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:j]
+            negate = body[:1] in ('!', '^')
+            if negate:
+                body = body[1:]
+            body = ''.join('\\' + ch if ch in '\\[]&~|^' else ch for ch in body)
+            out.append(f"(?!/)[{'^' if negate else ''}{body}]")
+            i = j + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    body = ''.join(out)
+    return body if anchored else '(?:.*/)?' + body
+
+
+def parse(lines):
+    """(regex source, negated, folders_only) for each pattern in an ignore file."""
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        if not line or line.startswith('#'):
+            continue
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+        folders_only = line.endswith('/')
+        source = translate(line.rstrip('/'))
+        if source is not None:
+            rules.append((source, negated, folders_only))
+    return rules
+
+
+def compile_rules(rules):
+    """One regex trying the rules last to first, plus which groups are negations."""
+    if not rules:
+        return None, ()
+    parts = []
+    negations = [None]  # group numbers start at 1
+    for source, negated, _folders_only in reversed(rules):
+        parts.append(f'({source})')
+        negations.append(negated)
+    return re.compile('(?:' + '|'.join(parts) + r')\Z', FLAGS), tuple(negations)
+
+
+class IgnoreRules:
+    """The ignore rules in force in one folder: its own files' plus its parents'."""
+
+    def __init__(self, parent=None, base='', rules=()):
+        self.parent = parent
+        self.base = base  # rel path of the folder the rules came from, '' or ending in a separator
+        self.dirs_re, self.dirs_neg = compile_rules(rules)
+        self.files_re, self.files_neg = compile_rules([r for r in rules if not r[2]])
+
+    def ignored(self, rel, is_dir):
+        """True if the entry at rel (relative to the scope) is excluded."""
+        node = self
+        while node is not None:
+            regex, negations = (node.dirs_re, node.dirs_neg) if is_dir else (node.files_re, node.files_neg)
+            if regex is not None:
+                m = regex.match(rel, len(node.base))
+                if m:
+                    return not negations[m.lastindex]
+            node = node.parent
+        return False
+
+
+EMPTY = IgnoreRules()
+
+
+def read_rules(folder):
+    """Parsed patterns of folder's ignore files, .gitignore's first."""
+    rules = []
+    for name in IGNORE_FILES:
+        try:
+            with open(os.path.join(folder, name), encoding='utf-8', errors='replace') as f:
+                rules.extend(parse(f))
+        except OSError:
+            continue
+    return rules
+
+
+def extend(rules, folder, rel_dir, names):
+    """Rules for a folder whose listing holds names, given its parent's rules.
+
+    Only reads ignore files that the listing shows are there; a folder without
+    any gets its parent's rules object back unchanged.
+    """
+    if not any(name in IGNORE_FILES for name in names):
+        return rules
+    own = read_rules(folder)
+    return IgnoreRules(rules, rel_dir, own) if own else rules
+
+
+class Loader:
+    """load() for any number of folders in one scope, reading each folder's
+    ignore files once however many folders below it are asked about."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.cache = {}
+
+    def load(self, rel_dir=''):
+        rules = self.cache.get(rel_dir)
+        if rules is None:
+            if rel_dir:
+                parent = rel_dir[:-1].rpartition(os.sep)[0]
+                parent_rules = self.load(parent + os.sep if parent else '')
+            else:
+                parent_rules = EMPTY
+            rules = extend(parent_rules, os.path.join(self.scope, rel_dir), rel_dir, IGNORE_FILES)
+            self.cache[rel_dir] = rules
+        return rules
+
+
+def load(scope, rel_dir=''):
+    """Rules in force in rel_dir (relative to scope, '' or ending in a
+    separator), reading the ignore files of every folder from scope down."""
+    return Loader(scope).load(rel_dir)
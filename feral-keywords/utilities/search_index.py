@@ -0,0 +1,293 @@
+"""
+Persistent, incrementally refreshed path index for search.py's `index` engine.
+
+The index remembers every directory in a scope along with that directory's
+mtime and its (already pruned) listing. A directory's mtime changes whenever an
+entry is added, removed or renamed inside it, so a refresh only has to stat each
+known directory and re-list the ones whose mtime moved — O(dirs) cheap stats
+instead of the full O(entries) listing the walk engine redoes on every keystroke.
+Contents edits don't bump the parent's mtime, but they don't change any names
+either, and names are all we match on.
+
+Layout (pickled via search_store):
+
+    {'version': INDEX_VERSION,
+     'stamp': random token, replaced whenever the listing changes,
+     'dirs': {rel_dir: (mtime_ns, ((name, is_dir), ...), (subdir, ...),
+                        (ignore file, ...))}}
+
+rel_dir is relative to the scope ('' for the scope itself). The listing keeps
+symlinked folders flagged as dirs, but only real subdirectories are descended
+into — the same rule os.walk follows, so both engines see the same tree.
+
+The last field names the folder's .gitignore/.feralignore files (pruned from
+the listing itself, like every dotfile), so the ignore rules in force can be
+worked out without trying to open them in every folder. refresh_index() can
+apply those rules as it goes, never entering an excluded folder, and reports
+the rules for each folder it kept; ignore_rules() works them out for an
+index refreshed without them. Either way, ignored() then tells which entries
+are excluded. The files are read on every refresh, so editing one takes
+effect on the next run even though it doesn't change any folder's mtime.
+
+Optionally a trigram index sits next to it (the scope's `.trigrams` file):
+for every three-character substring of every lowercased relative path, the
+sorted ids of the paths containing it, where an id is the path's position in
+iter_entries(). A query term of three or more characters can only occur in
+paths that contain all of its trigrams, so intersecting those posting lists
+leaves a handful of candidates to verify instead of a scan of every path. The
+trigram file records the index stamp it was built from and is rebuilt in full
+whenever that stamp moves.
+"""
+
+import os
+from array import array
+from collections import defaultdict
+
+import search_ignore
+import search_store
+
+INDEX_VERSION = 3
+
+
+def load_index(scope):
+    index = search_store.load(search_store.scope_file(scope, 'index'))
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+        return {'version': INDEX_VERSION, 'stamp': None, 'dirs': {}}
+    return index
+
+
+def save_index(scope, index):
+    search_store.save(search_store.scope_file(scope, 'index'), index)
+
+
+def new_stamp():
+    return os.urandom(8).hex()
+
+
+def list_dir(full, keep):
+    """One directory's pruned listing: (entries, subdirs to descend into,
+    ignore files present)."""
+    entries = []
+    subdirs = []
+    ignore_files = []
+    with os.scandir(full) as it:
+        for entry in it:
+            if entry.name in search_ignore.IGNORE_FILES:
+                ignore_files.append(entry.name)
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if not keep(entry.name, is_dir):
+                continue
+            entries.append((entry.name, is_dir))
+            if is_dir and not entry.is_symlink():
+                subdirs.append(entry.name)
+    entries.sort()
+    subdirs.sort()
+    return tuple(entries), tuple(subdirs), tuple(sorted(ignore_files))
+
+
+def folder_rules(scope, rel, parent_rules, record):
+    """The ignore rules in force inside the indexed folder rel, given its parent's."""
+    full = os.path.join(scope, rel) if rel else scope
+    return search_ignore.extend(parent_rules, full, rel + os.sep if rel else '', record[3])
+
+
+def refresh_index(scope, index, keep, rules=None):
+    """Bring index up to date with the tree. Returns True if anything changed.
+
+    keep(name, is_dir) decides which entries are indexed at all; pruned dirs
+    are never entered. Directories that have disappeared (or become
+    unreadable) drop out along with everything under them.
+
+    With a rules dict, folders excluded by ignore files are pruned too, and
+    rules is filled with {rel_dir: IgnoreRules} for every folder kept.
+    """
+    old = index['dirs']
+    fresh = {}
+    changed = False
+    stack = [('', search_ignore.EMPTY)]
+    while stack:
+        rel, parent_rules = stack.pop()
+        full = os.path.join(scope, rel) if rel else scope
+        try:
+            mtime = os.stat(full).st_mtime_ns
+        except OSError:
+            changed = True
+            continue
+        cached = old.get(rel)
+        if cached is not None and cached[0] == mtime:
+            record = cached
+        else:
+            try:
+                listing = list_dir(full, keep)
+            except OSError:
+                changed = True
+                continue
+            record = (mtime,) + listing
+            changed = True
+        fresh[rel] = record
+        subdirs = (os.path.join(rel, d) if rel else d for d in record[2])
+        if rules is None:
+            stack.extend((sub, None) for sub in subdirs)
+            continue
+        own = rules[rel] = folder_rules(scope, rel, parent_rules, record)
+        stack.extend((sub, own) for sub in subdirs if not own.ignored(sub, True))
+    if len(fresh) != len(old):
+        changed = True
+    # An unchanged index keeps its old dict (and so its iteration order, which
+    # trigram ids are positions in); a changed one gets a new stamp.
+    if changed:
+        index['dirs'] = fresh
+        index['stamp'] = new_stamp()
+    return changed
+
+
+def scan_subtree(scope, index, rel, keep):
+    """List rel and everything under it from scratch. Returns the rel dirs added."""
+    dirs = index['dirs']
+    added = []
+    stack = [rel]
+    while stack:
+        rel = stack.pop()
+        full = os.path.join(scope, rel) if rel else scope
+        try:
+            mtime = os.stat(full).st_mtime_ns
+            listing = list_dir(full, keep)
+        except OSError:
+            continue
+        dirs[rel] = (mtime,) + listing
+        added.append(rel)
+        stack.extend(os.path.join(rel, d) if rel else d for d in listing[1])
+    return added
+
+
+def drop_subtree(index, rel):
+    """Forget rel and everything under it. Returns the rel dirs removed."""
+    dirs = index['dirs']
+    prefix = rel + os.sep if rel else ''
+    removed = [d for d in dirs if d == rel or d.startswith(prefix)]
+    for d in removed:
+        del dirs[d]
+    return removed
+
+
+def relist_dir(scope, index, rel, keep):
+    """Re-list a single directory after a change notification.
+
+    Subdirectories that appeared are listed in full; ones that vanished are
+    dropped with their whole subtree. Returns (added, removed) rel dirs so a
+    watcher can start/stop watching them.
+    """
+    dirs = index['dirs']
+    full = os.path.join(scope, rel) if rel else scope
+    old = dirs.get(rel)
+    try:
+        mtime = os.stat(full).st_mtime_ns
+        listing = list_dir(full, keep)
+    except OSError:
+        index['stamp'] = new_stamp()
+        return [], drop_subtree(index, rel)
+    dirs[rel] = (mtime,) + listing
+    subdirs = listing[1]
+    index['stamp'] = new_stamp()
+    before = set(old[2]) if old else set()
+    after = set(subdirs)
+    removed = []
+    for d in sorted(before - after):
+        removed += drop_subtree(index, os.path.join(rel, d) if rel else d)
+    added = []
+    for d in sorted(after - before):
+        added += scan_subtree(scope, index, os.path.join(rel, d) if rel else d, keep)
+    return added, removed
+
+
+def ignore_rules(scope, index):
+    """{rel_dir: IgnoreRules} for every indexed folder that no ignore file excludes."""
+    dirs = index['dirs']
+    rules = {}
+    stack = [('', search_ignore.EMPTY)]
+    while stack:
+        rel, parent_rules = stack.pop()
+        record = dirs.get(rel)
+        if record is None:
+            continue
+        own = rules[rel] = folder_rules(scope, rel, parent_rules, record)
+        for d in record[2]:
+            sub = os.path.join(rel, d) if rel else d
+            if not own.ignored(sub, True):
+                stack.append((sub, own))
+    return rules
+
+
+def ignored(rules, rel, is_dir):
+    """True if the entry at rel is excluded, given rules from refresh_index()
+    or ignore_rules(): by its folder's rules, or because its folder is."""
+    own = rules.get(os.path.dirname(rel))
+    return own is None or own.ignored(rel, is_dir)
+
+
+def iter_entries(index):
+    """Yield (rel_path, is_dir) for every indexed entry."""
+    for rel_dir, (_mtime, entries, _subdirs, _ignore_files) in index['dirs'].items():
+        if rel_dir:
+            prefix = rel_dir + os.sep
+            for name, is_dir in entries:
+                yield prefix + name, is_dir
+        else:
+            yield from entries
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def build_trigrams(entries):
+    """Posting lists for entries (a list of (rel, is_dir)), as packed uint32s."""
+    postings = defaultdict(lambda: array('I'))
+    for i, (rel, _is_dir) in enumerate(entries):
+        for tri in trigrams(rel.lower()):
+            postings[tri].append(i)
+    return {tri: ids.tobytes() for tri, ids in postings.items()}
+
+
+def load_trigrams(scope, index, entries):
+    """The scope's trigram postings, rebuilt and saved if the index moved on."""
+    path = search_store.scope_file(scope, 'trigrams')
+    stamp = index.get('stamp')
+    cached = search_store.load(path)
+    if stamp is not None and isinstance(cached, dict) and cached.get('stamp') == stamp:
+        return cached['postings']
+    postings = build_trigrams(entries)
+    if stamp is not None:
+        search_store.save(path, {'stamp': stamp, 'postings': postings})
+    return postings
+
+
+def trigram_candidates(postings, terms):
+    """Sorted ids of entries that may contain every term, or None to scan.
+
+    Only terms of three or more characters narrow the set; if there are none,
+    the caller has to fall back to checking every entry. Survivors still need
+    verifying — having all of a term's trigrams doesn't mean containing it.
+    """
+    wanted = set()
+    for term in terms:
+        if len(term) >= 3:
+            wanted |= trigrams(term)
+    if not wanted:
+        return None
+    lists = []
+    for tri in wanted:
+        packed = postings.get(tri)
+        if packed is None:
+            return []
+        lists.append(packed)
+    lists.sort(key=len)
+    ids = set(array('I', lists[0]))
+    for packed in lists[1:]:
+        if not ids:
+            break
+        ids.intersection_update(array('I', packed))
+    return sorted(ids)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+locate-style path databases for search.py's `locate` engine (and the stand-in
+mdfind in ../benchmarks/fake-mdfind).
+
+Usage:
+    search_locate.py [--db PATH] "<scope>" [...]    # (re)build, like updatedb
+
+A database is a snapshot of every path under a scope — dotfiles, node_modules
+and all, like Spotlight's or locate's own — so whoever reads it decides what to
+prune. It is rebuilt out of band (run this from cron/launchd, or let the locate
+engine build a missing one on first use); queries never touch the tree.
+
+The format is front-coded text, as locate's own databases are: entries are
+sorted, and each line stores only how many leading characters it shares with
+the previous path plus the rest, so deep trees with long common prefixes shrink
+to a fraction of a plain path list:
+
+    feral-locate 1
+    <absolute scope>
+    <shared>\t<d|f><suffix>
+    ...
+"""
+
+import argparse
+import os
+import sys
+
+import search_store
+
+MAGIC = 'feral-locate 1'
+
+
+def default_db(scope):
+    return search_store.scope_file(scope, 'locate')
+
+
+def scan(scope):
+    """Every (rel, is_dir) under scope, unpruned; symlinked folders not entered."""
+    out = []
+    stack = ['']
+    while stack:
+        rel_root = stack.pop()
+        try:
+            with os.scandir(os.path.join(scope, rel_root) if rel_root else scope) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
+                    rel = rel_root + entry.name
+                    out.append((rel, is_dir))
+                    if is_dir and not entry.is_symlink():
+                        stack.append(rel + os.sep)
+        except OSError:
+            continue
+    out.sort()
+    return out
+
+
+def write_db(db_path, scope, entries):
+    """Write sorted (rel, is_dir) entries front-coded, atomically."""
+    tmp = db_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8', errors='surrogateescape') as f:
+        f.write(f'{MAGIC}\n{os.path.abspath(scope)}\n')
+        prev = ''
+        for rel, is_dir in entries:
+            shared = 0
+            limit = min(len(prev), len(rel))
+            while shared < limit and prev[shared] == rel[shared]:
+                shared += 1
+            f.write(f"{shared}\t{'d' if is_dir else 'f'}{rel[shared:]}\n")
+            prev = rel
+    os.replace(tmp, db_path)
+
+
+def build_db(scope, db_path=None):
+    db_path = db_path or default_db(scope)
+    write_db(db_path, scope, scan(scope))
+    return db_path
+
+
+def read_db(db_path):
+    """(scope, iterator of (rel, is_dir)) for a database; raises OSError/ValueError."""
+    f = open(db_path, 'r', encoding='utf-8', errors='surrogateescape')
+    if f.readline().rstrip('\n') != MAGIC:
+        f.close()
+        raise ValueError(f'{db_path}: not a locate database')
+    scope = f.readline().rstrip('\n')
+
+    def entries():
+        prev = ''
+        with f:
+            for line in f:
+                shared, _, rest = line.rstrip('\n').partition('\t')
+                rel = prev[:int(shared)] + rest[1:]
+                yield rel, rest[:1] == 'd'
+                prev = rel
+    return scope, entries()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--db', help='database path (default: the scope\'s file in the workflow cache)')
+    ap.add_argument('scopes', nargs='+')
+    args = ap.parse_args()
+    if args.db and len(args.scopes) > 1:
+        ap.error('--db takes a single scope')
+    for scope in args.scopes:
+        scope = os.path.expanduser(scope)
+        if not os.path.isdir(scope):
+            print(f"Not a folder: {scope}", file=sys.stderr)
+            continue
+        print(f"✓ {scope} → {build_db(scope, args.db)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Term matching for search.py's engines: every term in, no excluded term in.
+
+An engine checks each candidate path against the whole query, so this is the
+innermost loop of every name search. compile() turns a query's terms into one
+predicate, once per query, rather than re-running a generic loop over the
+terms for each path:
+
+  - Redundant terms are dropped: a term inside a longer one ("fe feral") adds
+    nothing, nor does an excluded term that holds a shorter excluded one. An
+    excluded term inside a wanted one ("feral -era") can never pass, so that
+    query matches nothing without looking at a path.
+  - The longest wanted terms are tested first — they're the rarest, so most
+    paths are dropped on the first test — and excluded terms last, on the few
+    paths that are left.
+  - The tests are generated as a single expression (`'feral' in hay and
+    'draft' not in hay`), so each is a bare C substring search: no generator,
+    no all()/any() frames, nothing per term but the search itself.
+
+An Aho-Corasick automaton would check every term in one pass, but it has to
+be stepped through in Python a character at a time. benchmarks/bench-match.py
+times it beside this check and the loop this replaced: on an 18,000-path
+tree the automaton took 11-25 µs per path, this check 0.18-0.47 µs. This
+check's cost does still grow with the number of terms when every test has
+to run (all-hit: ~180 ns for one term, ~470 ns for eight), but it stays some
+fifty times below the automaton's single pass.
+"""
+
+from functools import lru_cache
+
+
+def reduce_terms(terms, negated):
+    """(wanted, excluded) with redundant terms dropped, wanted longest first;
+    None if no path can match."""
+    wanted = []
+    for term in sorted(set(terms), key=len, reverse=True):
+        if not any(term in longer for longer in wanted):
+            wanted.append(term)
+    excluded = []
+    for term in sorted(set(negated), key=len):
+        if any(term in w for w in wanted):
+            return None
+        if not any(shorter in term for shorter in excluded):
+            excluded.append(term)
+    return wanted, excluded
+
+
+@lru_cache(maxsize=32)
+def compile_terms(terms, negated=()):
+    """A function of a lowercased path: True if it holds every term in terms and
+    none in negated (both tuples of lowercase strings)."""
+    reduced = reduce_terms(terms, negated)
+    if reduced is None:
+        return lambda hay: False
+    wanted, excluded = reduced
+    tests = [f'{t!r} in hay' for t in wanted] + [f'{t!r} not in hay' for t in excluded]
+    return eval('lambda hay: ' + (' and '.join(tests) or 'True'))
+
+
+def compile(terms, negated=()):
+    return compile_terms(tuple(terms), tuple(negated))
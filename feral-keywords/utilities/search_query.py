@@ -0,0 +1,123 @@
+"""
+The query language of search.py.
+
+A query is whitespace-separated tokens. Plain tokens are terms, matched as
+before (every one must match the path). On top of those:
+
+    ext:pdf          extension is .pdf; ext:pdf,png for either (repeatable)
+    in:assets        some folder on the path (relative to the scope) contains
+                     "assets"; every in: must hold
+    modified:<7d     modified within the last 7 days; modified:>1y for older
+                     than a year. Units: s, m (minutes), h, d, w, y
+    size:>10m        bigger than 10 MB; size:<100k for smaller. Units: b, k,
+                     m, g (powers of 1024). >=, <= and = work too
+    -draft           the path must not contain "draft"
+
+Filters are checked cheapest first, so most candidates are dropped before any
+string work: the extension (a suffix test on the name), then in: (the
+relative path), and only then modified:/size:, which need a stat — the walk
+engine passes the one its DirEntry already made. Negated terms aren't checked
+here: they go to search_match.compile() with the terms, and are tested in the
+same compiled check. A token with an
+unknown prefix ("foo:bar") is an ordinary term; a malformed filter raises
+ValueError with a message fit to show the user.
+"""
+
+import operator
+import os
+import re
+import time
+
+OPS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '=': operator.eq}
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400, 'y': 365 * 86400}
+SIZE_UNITS = {'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+COMPARISON_RE = re.compile(r'^(<=|>=|<|>|=)?(\d+(?:\.\d+)?)([a-z]?)$')
+
+
+def parse_comparison(key, value, units, default_op, default_unit):
+    m = COMPARISON_RE.match(value.lower())
+    if not m or (m.group(3) and m.group(3) not in units):
+        raise ValueError(f"Can't read “{key}:{value}” — try {key}:>{'10m' if key == 'size' else '7d'}")
+    op, number, unit = m.groups()
+    return OPS[op or default_op], float(number) * units[unit or default_unit]
+
+
+class Query:
+    """A parsed query: terms for the engines, plus filters any candidate must pass."""
+
+    def __init__(self, text=''):
+        self.terms = []
+        self.negated = []
+        self.exts = set()
+        self.within = []
+        self.modified = None  # (op, age in seconds): op(age of the file, limit)
+        self.size = None      # (op, bytes)
+        for token in text.split():
+            self.add(token)
+
+    def add(self, token):
+        key, colon, value = token.partition(':')
+        key = key.lower()
+        if colon and value and key == 'ext':
+            self.exts.update('.' + e.lstrip('.').lower() for e in value.split(',') if e.strip('.'))
+        elif colon and value and key == 'in':
+            self.within.append(value.lower())
+        elif colon and value and key == 'modified':
+            self.modified = parse_comparison(key, value, AGE_UNITS, '<', 'd')
+        elif colon and value and key == 'size':
+            self.size = parse_comparison(key, value, SIZE_UNITS, '>', 'b')
+        elif token.startswith('-') and len(token) > 1:
+            self.negated.append(token[1:].lower())
+        else:
+            self.terms.append(token.lower())
+
+    @property
+    def has_filters(self):
+        return bool(self.exts or self.within or self.negated or self.modified or self.size)
+
+    @property
+    def needs_stat(self):
+        return self.modified is not None or self.size is not None
+
+    def key(self):
+        """Hashable form of the filters (not the terms), for cache keys."""
+        return (tuple(sorted(self.exts)), tuple(self.within), tuple(self.negated),
+                self.modified and (self.modified[0].__name__, self.modified[1]),
+                self.size and (self.size[0].__name__, self.size[1]))
+
+    def accepts(self, rel, is_dir, full=None, st=None):
+        """True if the entry at rel (relative to the scope) passes every filter
+        but the negated terms.
+
+        st is the entry's stat result when the caller already has one; without
+        it, full is statted — but only if the cheaper filters passed first.
+        """
+        if self.exts:
+            if is_dir:
+                return False
+            dot = rel.rfind('.')
+            if dot < 0 or rel[dot:].lower() not in self.exts:
+                return False
+        if self.within:
+            folders = rel.lower().rpartition(os.sep)[0]
+            if not folders or not all(w in folders for w in self.within):
+                return False
+        if self.modified is None and self.size is None:
+            return True
+        if st is None:
+            try:
+                st = os.stat(full)
+            except (OSError, TypeError):
+                return False
+        if self.modified is not None:
+            op, limit = self.modified
+            if not op(time.time() - st.st_mtime, limit):
+                return False
+        if self.size is not None:
+            op, limit = self.size
+            if is_dir or not op(st.st_size, limit):
+                return False
+        return True
+
+
+EMPTY = Query()
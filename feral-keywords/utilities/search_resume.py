@@ -0,0 +1,99 @@
+"""
+Resume cursors for search.py's time budget.
+
+On a huge tree the walk engine can't finish inside one keystroke's budget.
+Rather than make Alfred wait, search.py answers with the best matches so far
+plus Alfred's `rerun` key, and records here where the walk stopped: the folders
+it hadn't listed yet, the ranked results, and the candidates seen. Alfred then
+reruns the script filter with the same query, and that run picks the walk up
+from the cursor instead of starting over — so the list fills in over a few
+reruns instead of appearing all at once after the whole walk.
+
+One cursor is kept per scope (search_store's `.resume` file). It only applies
+to the exact same query and engine settings, and only for TTL seconds — past
+that the tree may have changed under it, and a fresh walk is cheap compared to
+serving stale results.
+
+A cursor doesn't help when the query changes, and with Alfred's "terminate
+previous script" queue mode it changes on every key: each run is killed
+(SIGTERM) before its walk ends, and the next starts over. So the walk also
+keeps a checkpoint of the folder listings it has made, whatever the query
+(the `.walk` file): the next walk of the scope takes those folders from it
+instead of listing them again, and spends its time on the folders nobody has
+listed yet — fast typing still converges on a complete walk. Each folder is
+kept with its mtime, and one whose mtime has moved since is listed again, so
+files added or removed show up on the next walk rather than being served from
+the checkpoint as if the walk were complete. The checkpoint is dropped
+LISTINGS_TTL seconds after it was started, and holds at most MAX_LISTED
+entries.
+"""
+
+import os
+import time
+
+import search_store
+
+TTL = 30.0
+LISTINGS_TTL = 120.0
+LISTINGS_VERSION = 2
+MAX_LISTED = 500000
+
+
+def load(scope, mode, terms):
+    """The cursor saved for this exact query, or None.
+
+    Returns a dict with 'roots' (folders still to walk, relative to scope, each
+    ending in a separator), 'top' (ranked (full, is_dir) results so far) and
+    'hits' (the candidates seen, for the prefix cache).
+    """
+    state = search_store.load(search_store.scope_file(scope, 'resume'))
+    if not isinstance(state, dict):
+        return None
+    if state.get('mode') != mode or state.get('terms') != terms:
+        return None
+    if time.time() - state.get('created', 0) > TTL:
+        return None
+    return state
+
+
+def save(scope, mode, terms, roots, top, hits):
+    search_store.save(search_store.scope_file(scope, 'resume'), {
+        'created': time.time(),
+        'mode': mode,
+        'terms': list(terms),
+        'roots': list(roots),
+        'top': list(top),
+        'hits': list(hits),
+    })
+
+
+def clear(scope):
+    try:
+        os.remove(search_store.scope_file(scope, 'resume'))
+    except OSError:
+        pass
+
+
+def load_listings(scope):
+    """The scope's walk checkpoint if it's fresh, else None.
+
+    A dict with 'created' and 'listings', which maps each folder listed
+    (relative to scope, '' or ending in a separator) to its mtime_ns when
+    listed and its (name, is_dir, is_symlinked_dir) entries.
+    """
+    state = search_store.load(search_store.scope_file(scope, 'walk'))
+    if not isinstance(state, dict) or state.get('version') != LISTINGS_VERSION:
+        return None
+    if time.time() - state.get('created', 0) > LISTINGS_TTL:
+        return None
+    return state
+
+
+def save_listings(scope, listings, created=None):
+    if sum(len(entries) for _mtime, entries in listings.values()) > MAX_LISTED:
+        return
+    search_store.save(search_store.scope_file(scope, 'walk'), {
+        'version': LISTINGS_VERSION,
+        'created': time.time() if created is None else created,
+        'listings': listings,
+    })
@@ -0,0 +1,68 @@
+"""
+On-disk state for search.py, kept per scope in the workflow's cache folder.
+
+Alfred hands every script its cache folder as $alfred_workflow_cache; when the
+script is run by hand (or on a box without Alfred) we fall back to the usual
+per-user cache location. Each scope gets its own files, named after a hash of
+the scope's absolute path so two scopes never collide and odd characters in
+folder names never reach the filesystem.
+
+Writes go through a temp file + os.replace so a run that's killed mid-write
+(Alfred terminates stale script filter runs) never leaves a torn file behind;
+the next run just sees the previous version.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+
+def cache_dir():
+    """The folder search state lives in, created on first use."""
+    path = os.environ.get('alfred_workflow_cache', '').strip()
+    if not path:
+        base = os.path.expanduser('~/Library/Caches')
+        if not os.path.isdir(base):
+            base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        path = os.path.join(base, 'co.feralcreative.keywords')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def scope_file(scope, kind):
+    """Path of the `kind` state file (e.g. 'index') for a scope."""
+    key = hashlib.sha1(os.path.abspath(scope).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir(), f'{key}.{kind}')
+
+
+def load(path, default=None):
+    """Unpickle a state file, or return default if it's missing or unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return default
+
+
+def save(path, obj):
+    """Atomically pickle obj to path. Failures are swallowed — it's a cache.
+
+    The temp file is removed however the write ends, including a run being
+    terminated in the middle of it.
+    """
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        tmp = None
+    except OSError:
+        pass
+    finally:
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark port-roulette's free-port search against how full the port range is.
+
+Usage:
+    bench-bitmap.py [--occupancy PCT ...] [--queries N] [--seed N] [--output FILE]
+
+For each occupancy, marks that share of the user ports (1024-65535) taken at
+random and times, for --queries random base ports, two ways of finding a
+free one:
+
+  list    the search port-roulette.py ran before port_bitmap: `port in
+          used_ports` on the JSON list for every probe, and the next probe
+          made by appending the port's last digit (giving up after 100)
+  bitmap  port_bitmap.PortBitmap.nearest_free on a bitmap of the same ports
+
+Each figure is microseconds per query. The list search's give-ups (`failed`,
+queries that ended on a taken or out-of-range port) are counted too.
+
+Before timing, the property tests in ../test_port_bitmap.py are run (the
+bitmap against brute force); a failure stops the run. The JSON goes to
+--output (or stdout).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import port_bitmap  # noqa: E402
+import test_port_bitmap  # noqa: E402
+
+LOW = 1024
+HIGH = 65535
+
+
+def list_search(base_port, used_ports):
+    """The pre-bitmap find_available_port, minus the well-known list: (port, gave up)."""
+    port = base_port
+    conflicts = 0
+    while port in used_ports or not LOW <= port <= HIGH:
+        conflicts += 1
+        port = int(str(port) + str(port % 10))
+        if port > HIGH:
+            port = base_port + 1000
+        if conflicts > 100:
+            return port, True
+    return port, False
+
+
+def check_properties(rng):
+    """Run test_port_bitmap's property tests; raise SystemExit on any failure."""
+    try:
+        test_port_bitmap.run_all(rng)
+    except AssertionError as e:
+        raise SystemExit(f"port_bitmap property failed: {e}")
+
+
+def time_queries(search, bases):
+    start = time.perf_counter()
+    for base in bases:
+        search(base)
+    return round((time.perf_counter() - start) / len(bases) * 1e6, 2)
+
+
+def bench_occupancy(rng, pct, queries):
+    user_ports = range(LOW, HIGH + 1)
+    used = rng.sample(user_ports, int(len(user_ports) * pct / 100))
+    bitmap = port_bitmap.PortBitmap.from_ports(range(LOW), used)
+    bases = [rng.randrange(LOW, HIGH + 1) for _ in range(queries)]
+    failed = sum(list_search(base, used)[1] for base in bases)
+    return {
+        'occupancy': pct,
+        'used_ports': len(used),
+        'list_us': time_queries(lambda base: list_search(base, used), bases),
+        'bitmap_us': time_queries(lambda base: bitmap.nearest_free(base, LOW, HIGH), bases),
+        'failed': failed,
+    }
+
+
+def print_table(report, file=sys.stderr):
+    print(f"µs per query ({report['queries']} queries)", file=file)
+    print(f"  {'occupancy':>9} {'list':>10} {'bitmap':>8} {'failed':>7}", file=file)
+    for row in report['rows']:
+        print(f"  {row['occupancy']:>8}% {row['list_us']:>10} {row['bitmap_us']:>8} {row['failed']:>7}", file=file)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--occupancy', type=float, nargs='+', default=[1, 10, 50, 90, 99],
+                    help='percent of user ports taken (default: 1 10 50 90 99)')
+    ap.add_argument('--queries', type=int, default=50)
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    check_properties(rng)
+    report = {
+        'version': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'queries': args.queries,
+        'rows': [bench_occupancy(rng, pct, args.queries) for pct in args.occupancy],
+    }
+    print_table(report)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
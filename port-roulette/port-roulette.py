@@ -8,8 +8,12 @@ import sys
 import json
 import os
 import re
+import hashlib
+import tempfile
 from pathlib import Path
 
+import port_bitmap
+
 # Configuration file path - configurable through Alfred's workflow settings
 # Read config directory from Alfred's user configuration
 HOME_DIR = os.environ.get('HOME') or os.path.expanduser('~')
@@ -207,36 +211,59 @@ def is_valid_port(port):
     """Check if port is in valid range"""
     return 1024 <= port <= 65535
 
-def is_port_available(port, config):
-    """Check if port is available (not well-known, not used)"""
-    return (port not in WELL_KNOWN_PORTS and
-            port not in config.get("used_ports", []) and
-            is_valid_port(port))
-
-def find_available_port(base_port, config):
-    """Find an available port starting from base_port"""
-    port = base_port
-    conflicts = []
-
-    while not is_port_available(port, config):
-        if port in WELL_KNOWN_PORTS:
-            conflicts.append(f"Port {port} is a well-known port")
-        elif port in config.get("used_ports", []):
-            conflicts.append(f"Port {port} is already used")
-        elif not is_valid_port(port):
-            conflicts.append(f"Port {port} is out of valid range")
+# Changes whenever WELL_KNOWN_PORTS does, so a cached bitmap built from an
+# older list isn't reused
+WELL_KNOWN_KEY = hashlib.sha1(repr(sorted(WELL_KNOWN_PORTS)).encode()).hexdigest()[:12]
 
-        # Try next port by adding a random digit
-        port = int(str(port) + str((port % 10)))
+def get_bitmap_file():
+    """Where the occupancy bitmap is cached: Alfred's cache folder for the workflow"""
+    cache_dir = os.environ.get('alfred_workflow_cache', '').strip()
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            cache_dir = ''
+    return os.path.join(cache_dir or tempfile.gettempdir(), 'port-roulette-occupancy.bin')
 
-        # Prevent infinite loop
-        if port > 65535:
-            port = base_port + 1000
+def load_occupancy(config):
+    """Bitmap of every taken port: well-known or already used.
 
-        # Safety check to prevent infinite loop
-        if len(conflicts) > 100:
-            break
+    Built from WELL_KNOWN_PORTS and config["used_ports"], and cached on disk
+    until the config file (or the well-known list) changes.
+    """
+    config_file = get_config_file()
+    try:
+        st = os.stat(config_file)
+        stamp = f"{config_file}:{st.st_mtime_ns}:{st.st_size}:{WELL_KNOWN_KEY}"
+    except OSError:
+        stamp = None
+
+    bitmap_file = get_bitmap_file()
+    if stamp:
+        bitmap = port_bitmap.load(bitmap_file, stamp)
+        if bitmap is not None:
+            return bitmap
+
+    bitmap = port_bitmap.PortBitmap.from_ports(WELL_KNOWN_PORTS, config.get("used_ports", []))
+    if stamp:
+        port_bitmap.save(bitmap_file, bitmap, stamp)
+    return bitmap
+
+def is_port_available(port, occupancy):
+    """Check if port is available (not well-known, not used)"""
+    return is_valid_port(port) and not occupancy.taken(port)
 
+def find_available_port(base_port, occupancy):
+    """Find the available port nearest to base_port (None if every port is taken)"""
+    conflicts = []
+    if base_port in WELL_KNOWN_PORTS:
+        conflicts.append(f"Port {base_port} is a well-known port")
+    elif not is_valid_port(base_port):
+        conflicts.append(f"Port {base_port} is out of valid range")
+    elif occupancy.taken(base_port):
+        conflicts.append(f"Port {base_port} is already used")
+
+    port = occupancy.nearest_free(base_port, low=1024, high=65535)
     return port, conflicts
 
 def alfred_output(title, subtitle, arg=""):
@@ -339,9 +366,9 @@ def main():
         print(json.dumps(alfred_output("Error", "Invalid project name - no letters found")))
         return
 
-    port, conflicts = find_available_port(base_port, config)
+    port, conflicts = find_available_port(base_port, load_occupancy(config))
 
-    if not is_valid_port(port):
+    if port is None or not is_valid_port(port):
         print(json.dumps(alfred_output("Error", "Could not find a valid port")))
         return
 
@@ -351,7 +378,7 @@ def main():
     # Prepare output
     subtitle = f"New port for '{project_name}'"
     if conflicts:
-        subtitle += f" (conflicts: {len(conflicts)})"
+        subtitle += f" ({base_port} is taken, nearest free port)"
 
     print(json.dumps(alfred_output(
         f"Port {port}",
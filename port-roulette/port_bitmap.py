@@ -0,0 +1,124 @@
+"""
+Port occupancy as a 65536-bit bitmap, for port-roulette.py.
+
+Bit p is set when port p is taken (well-known or already handed out). The
+bits are kept as WORDS 64-bit words, so checking a port is one shift and
+finding the nearest free port skips a whole word of taken ports per step:
+~word is that word's free ports, and its lowest or highest set bit is the
+nearest one in that direction. Even with 90% of ports taken nearly every
+word has a free bit, so a search looks at one or two words.
+
+The bitmap is cached on disk (save()/load()) under a stamp the caller
+derives from whatever it was built from; a stale stamp means rebuild.
+"""
+
+import os
+import tempfile
+
+PORTS = 65536
+WORD_BITS = 64
+WORDS = PORTS // WORD_BITS
+FULL = (1 << WORD_BITS) - 1
+MAGIC = b'port-bitmap 1\n'
+
+
+class PortBitmap:
+    """Which of the 65536 ports are taken."""
+
+    def __init__(self, words=None):
+        self.words = list(words) if words is not None else [0] * WORDS
+
+    @classmethod
+    def from_ports(cls, *port_lists):
+        """A bitmap with every port in every list taken; junk entries are ignored."""
+        words = [0] * WORDS
+        for ports in port_lists:
+            for port in ports:
+                if isinstance(port, int) and 0 <= port < PORTS:
+                    words[port >> 6] |= 1 << (port & 63)
+        return cls(words)
+
+    def add(self, port):
+        self.words[port >> 6] |= 1 << (port & 63)
+
+    def taken(self, port):
+        """True for a taken port, and for anything that isn't a port at all."""
+        if not 0 <= port < PORTS:
+            return True
+        return bool(self.words[port >> 6] >> (port & 63) & 1)
+
+    def count(self):
+        return sum(bin(word).count('1') for word in self.words)
+
+    def next_free(self, port, high=PORTS - 1):
+        """The lowest free port in [port, high], or None."""
+        w = port >> 6
+        free = ~self.words[w] & FULL & (FULL << (port & 63))
+        last = high >> 6
+        while not free:
+            w += 1
+            if w > last:
+                return None
+            free = ~self.words[w] & FULL
+        found = (w << 6) + (free & -free).bit_length() - 1
+        return found if found <= high else None
+
+    def prev_free(self, port, low=0):
+        """The highest free port in [low, port], or None."""
+        w = port >> 6
+        free = ~self.words[w] & ((2 << (port & 63)) - 1)
+        first = low >> 6
+        while not free:
+            w -= 1
+            if w < first:
+                return None
+            free = ~self.words[w] & FULL
+        found = (w << 6) + free.bit_length() - 1
+        return found if found >= low else None
+
+    def nearest_free(self, port, low=0, high=PORTS - 1):
+        """The free port in [low, high] closest to port (the higher one on a
+        tie), or None if they're all taken."""
+        if low > high:
+            return None
+        port = min(max(port, low), high)
+        up = self.next_free(port, high)
+        if up == port:
+            return port
+        # Below, only ports strictly closer than `up` can win.
+        floor = low if up is None else max(low, port - (up - port) + 1)
+        down = self.prev_free(port, floor) if floor <= port else None
+        return up if down is None else down
+
+    def to_bytes(self):
+        return b''.join(word.to_bytes(8, 'little') for word in self.words)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) != WORDS * 8:
+            raise ValueError(f'expected {WORDS * 8} bytes, got {len(data)}')
+        return cls(int.from_bytes(data[i:i + 8], 'little') for i in range(0, len(data), 8))
+
+
+def load(path, stamp):
+    """The bitmap saved at path under stamp, or None if it's missing, stale or unreadable."""
+    header = MAGIC + stamp.encode('utf-8') + b'\n'
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(header):
+            return None
+        return PortBitmap.from_bytes(data[len(header):])
+    except (OSError, ValueError):
+        return None
+
+
+def save(path, bitmap, stamp):
+    """Atomically write bitmap to path under stamp. Failures are ignored — it's a cache."""
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.port-bitmap-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + stamp.encode('utf-8') + b'\n' + bitmap.to_bytes())
+        os.replace(tmp, path)
+    except OSError:
+        pass
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Property tests for port_bitmap, checked against brute force on random bitmaps.
+
+Usage:
+    python3 test_port_bitmap.py      # or: python3 -m pytest test_port_bitmap.py
+
+Covers taken(), count(), next_free(), prev_free() and nearest_free()
+(nearest by distance, the higher port on a tie), the byte round trip, and
+load() refusing a stale stamp. benchmarks/bench-bitmap.py runs these before
+timing anything.
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import port_bitmap  # noqa: E402
+
+LOW = 1024
+HIGH = 65535
+ROUNDS = 200
+SEED = 1
+
+
+def brute_nearest(taken, port, low, high):
+    for distance in range(0, high - low + 1):
+        for candidate in (port + distance, port - distance):
+            if low <= candidate <= high and candidate not in taken:
+                return candidate
+    return None
+
+
+def random_bitmaps(rng, rounds=ROUNDS):
+    """Yield (round, taken ports, bitmap of them): mostly clustered or nearly
+    full maps, where the word scans matter."""
+    for round_no in range(rounds):
+        fill = rng.choice([0.0, 0.5, 0.9, 0.99, 1.0])
+        span = rng.choice([(0, port_bitmap.PORTS - 1), (LOW, HIGH), (4000, 4300)])
+        taken = {p for p in range(*span) if rng.random() < fill}
+        yield round_no, taken, port_bitmap.PortBitmap.from_ports(taken)
+
+
+def random_queries(rng, count=25):
+    """Yield (port, low, high), with ranges around the port, the user ports,
+    and sometimes an empty range (low > high)."""
+    for _ in range(count):
+        port = rng.randrange(port_bitmap.PORTS)
+        low = rng.choice([0, LOW, max(0, port - rng.randrange(200))])
+        high = rng.choice([HIGH, min(HIGH, port + rng.randrange(200))])
+        yield port, low, high
+
+
+def test_count_and_taken(rng=None):
+    rng = rng or random.Random(SEED)
+    for round_no, taken, bitmap in random_bitmaps(rng):
+        assert bitmap.count() == len(taken), f"count in round {round_no}"
+        for port, _low, _high in random_queries(rng):
+            assert bitmap.taken(port) == (port in taken), f"taken({port}) in round {round_no}"
+
+
+def test_next_and_prev_free(rng=None):
+    rng = rng or random.Random(SEED)
+    for round_no, taken, bitmap in random_bitmaps(rng):
+        for port, low, high in random_queries(rng):
+            if not low <= port <= high:
+                continue
+            up = next((p for p in range(port, high + 1) if p not in taken), None)
+            assert bitmap.next_free(port, high) == up, f"next_free({port}, {high}) in round {round_no}"
+            down = next((p for p in range(port, low - 1, -1) if p not in taken), None)
+            assert bitmap.prev_free(port, low) == down, f"prev_free({port}, {low}) in round {round_no}"
+
+
+def test_nearest_free(rng=None):
+    rng = rng or random.Random(SEED)
+    for round_no, taken, bitmap in random_bitmaps(rng):
+        for port, low, high in random_queries(rng):
+            clamped = min(max(port, low), high)
+            assert bitmap.nearest_free(port, low, high) == brute_nearest(taken, clamped, low, high), \
+                f"nearest_free({port}, {low}, {high}) in round {round_no}"
+
+
+def test_byte_round_trip(rng=None):
+    rng = rng or random.Random(SEED)
+    for round_no, _taken, bitmap in random_bitmaps(rng, rounds=20):
+        assert port_bitmap.PortBitmap.from_bytes(bitmap.to_bytes()).words == bitmap.words, \
+            f"byte round trip in round {round_no}"
+
+
+def test_load_checks_stamp():
+    tmp = tempfile.mkdtemp(prefix='test-port-bitmap-')
+    try:
+        path = os.path.join(tmp, 'occupancy.bin')
+        bitmap = port_bitmap.PortBitmap.from_ports([80, 443, 3000])
+        port_bitmap.save(path, bitmap, 'stamp-1')
+        loaded = port_bitmap.load(path, 'stamp-1')
+        assert loaded is not None and loaded.words == bitmap.words, "load after save"
+        assert port_bitmap.load(path, 'stamp-2') is None, "load accepted a stale stamp"
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def run_all(rng=None):
+    """Run every test; raises AssertionError on the first failure."""
+    rng = rng or random.Random(SEED)
+    test_count_and_taken(rng)
+    test_next_and_prev_free(rng)
+    test_nearest_free(rng)
+    test_byte_round_trip(rng)
+    test_load_checks_stamp()
+
+
+if __name__ == "__main__":
+    try:
+        run_all()
+    except AssertionError as e:
+        sys.exit(f"port_bitmap property failed: {e}")
+    print("port_bitmap: all properties hold")